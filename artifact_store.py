@@ -0,0 +1,218 @@
+import hashlib, json, logging, os, random, shutil, socket, threading, time
+from contextlib import contextmanager
+from urllib.parse import quote, unquote, urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows: LocalStore locks are in-process only
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """Finished artifacts shared between replicas, keyed like DownloadCache.
+
+    ``fetch(key, folder)`` copies a stored artifact into ``folder`` and
+    returns its metadata ({'file', 'title', 'sha256'}) or None.
+    ``upload`` publishes a local file. ``lock(key)`` is held by the one
+    replica producing ``key``; the others block in it and then find the
+    artifact with ``fetch``. A lock not had within ``lock_timeout`` seconds
+    is given up on, so a stuck replica costs duplicate work, not errors.
+    """
+
+    backend = None
+
+    def __init__(self, lock_timeout=600.0, poll=1.0):
+        self.lock_timeout, self.poll = lock_timeout, poll
+        self.counts = {'fetched': 0, 'missed': 0, 'uploaded': 0, 'lock_waits': 0, 'lock_timeouts': 0}
+        self.counts_lock = threading.Lock()
+
+    def _count(self, name):
+        with self.counts_lock: self.counts[name] += 1
+
+    def _name(self, key): return hashlib.sha1(key.encode()).hexdigest()
+
+    @contextmanager
+    def lock(self, key):
+        deadline, waited = time.monotonic() + self.lock_timeout, False
+        while not self._try_lock(key):
+            if time.monotonic() > deadline:
+                self._count('lock_timeouts')
+                log.warning('Lock %s tidak didapat dalam %ss, lanjut tanpa lock', key, self.lock_timeout)
+                yield False
+                return
+            if not waited: self._count('lock_waits')
+            waited = True
+            time.sleep(self.poll * random.uniform(0.5, 1.5))
+        try: yield True
+        finally: self._unlock(key)
+
+    def stats(self):
+        with self.counts_lock: return {'backend': self.backend, **self.counts}
+
+
+class LocalStore(ArtifactStore):
+    """Store in a directory, e.g. a volume mounted on every replica; locks are flock files next to it."""
+
+    backend = 'file'
+
+    def __init__(self, root, **kw):
+        super().__init__(**kw)
+        self.root = root
+        os.makedirs(os.path.join(root, 'locks'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self.held = {}
+
+    def fetch(self, key, folder):
+        obj = os.path.join(self.root, 'objects', self._name(key))
+        try:
+            with open(obj + '.json', encoding='utf-8') as f: meta = json.load(f)
+            dst = os.path.join(folder, meta['file'])
+            tmp = f'{dst}.{os.getpid()}-{threading.get_ident()}.tmp'
+            shutil.copyfile(obj, tmp)
+            os.replace(tmp, dst)
+        except (OSError, ValueError):
+            self._count('missed')
+            return None
+        self._count('fetched')
+        return meta
+
+    def upload(self, key, path, title, sha256):
+        obj = os.path.join(self.root, 'objects', self._name(key))
+        tmp = f'{obj}.{os.getpid()}-{threading.get_ident()}.tmp'
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, obj)
+        # Metadata last: a reader that sees it can rely on the object being complete
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'file': os.path.basename(path), 'title': title, 'sha256': sha256}, f)
+        os.replace(tmp, obj + '.json')
+        self._count('uploaded')
+
+    def _try_lock(self, key):
+        f = open(os.path.join(self.root, 'locks', self._name(key) + '.lock'), 'a')
+        if fcntl:
+            try: fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+        self.held[(key, threading.get_ident())] = f
+        return True
+
+    def _unlock(self, key):
+        f = self.held.pop((key, threading.get_ident()))
+        if fcntl: fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+
+class S3Store(ArtifactStore):
+    """Store in an S3-compatible bucket (AWS, MinIO, a local stand-in via ``endpoint_url``).
+
+    Locks are objects created with a conditional PUT (If-None-Match: *),
+    so exactly one replica wins. The holder renews the lease every
+    ``lease / 3`` seconds with If-Match on the ETag it last wrote, so a
+    holder whose lease ran out meanwhile (a GC pause, a slow network)
+    learns it lost the lock instead of overwriting the next holder's; it
+    releases the lock the same way. A lock whose lease ran out (its holder
+    died) is deleted with If-Match on its ETag and contended for again.
+    """
+
+    backend = 's3'
+    # Error codes S3 and compatible stores return when a conditional write or delete loses
+    CONFLICT = ('PreconditionFailed', 'ConditionalRequestConflict', '412', '409')
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, lease=60.0, **kw):
+        super().__init__(**kw)
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError('boto3 diperlukan untuk ARTIFACT_STORE s3://') from None
+        self.s3 = boto3.client('s3', endpoint_url=endpoint_url)
+        self.bucket, self.prefix, self.lease = bucket, prefix.strip('/'), lease
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self.renewers = {}
+
+    def _key(self, kind, key): return '/'.join(p for p in (self.prefix, kind, self._name(key)) if p)
+
+    @staticmethod
+    def _code(e): return getattr(e, 'response', {}).get('Error', {}).get('Code')
+
+    def fetch(self, key, folder):
+        obj = self._key('objects', key)
+        try:
+            meta = self.s3.head_object(Bucket=self.bucket, Key=obj)['Metadata']
+            meta = {'file': meta['file'], 'title': unquote(meta['title']), 'sha256': meta['sha256']}
+            dst = os.path.join(folder, meta['file'])
+            tmp = f'{dst}.{os.getpid()}-{threading.get_ident()}.tmp'
+            self.s3.download_file(self.bucket, obj, tmp)
+            os.replace(tmp, dst)
+        except Exception as e:
+            if self._code(e) not in ('404', 'NoSuchKey', 'NotFound'): log.warning('S3 fetch %s gagal: %s', key, e)
+            self._count('missed')
+            return None
+        self._count('fetched')
+        return meta
+
+    def upload(self, key, path, title, sha256):
+        # S3 user metadata must be ASCII, so the title is percent-encoded
+        self.s3.upload_file(path, self.bucket, self._key('objects', key), ExtraArgs={'Metadata': {
+            'file': os.path.basename(path), 'title': quote(title), 'sha256': sha256}})
+        self._count('uploaded')
+
+    def _lock_body(self):
+        return json.dumps({'owner': self.owner, 'expires': time.time() + self.lease}).encode()
+
+    def _try_lock(self, key):
+        obj = self._key('locks', key)
+        try:
+            etag = self.s3.put_object(Bucket=self.bucket, Key=obj, Body=self._lock_body(), IfNoneMatch='*')['ETag']
+        except Exception as e:
+            if self._code(e) not in self.CONFLICT: raise
+            try:
+                held = self.s3.get_object(Bucket=self.bucket, Key=obj)
+                if json.loads(held['Body'].read()).get('expires', 0) < time.time():
+                    self.s3.delete_object(Bucket=self.bucket, Key=obj, IfMatch=held['ETag'])
+            except Exception as e2:
+                log.debug('Lock %s: %s', key, e2)
+            return False
+        held = {'stop': threading.Event(), 'etag': etag}
+        def renew():
+            while not held['stop'].wait(self.lease / 3):
+                try:
+                    held['etag'] = self.s3.put_object(Bucket=self.bucket, Key=obj, Body=self._lock_body(),
+                                                      IfMatch=held['etag'])['ETag']
+                except Exception as e:
+                    if self._code(e) in (*self.CONFLICT, '404', 'NoSuchKey'):
+                        # Another replica took over after our lease ran out; the work goes on unlocked
+                        log.warning('Lock %s hilang (lease habis), tidak diperpanjang lagi', key)
+                        held['etag'] = None
+                        return
+                    log.warning('Perpanjang lock %s gagal: %s', key, e)
+        held['thread'] = threading.Thread(target=renew, daemon=True)
+        held['thread'].start()
+        self.renewers[(key, threading.get_ident())] = held
+        return True
+
+    def _unlock(self, key):
+        held = self.renewers.pop((key, threading.get_ident()))
+        held['stop'].set()
+        # A renewal still in flight would leave us holding an ETag that no longer matches
+        held['thread'].join()
+        if held['etag'] is None: return
+        obj = self._key('locks', key)
+        try:
+            # Only our own lock, exactly as we last wrote it, is deleted
+            current = self.s3.get_object(Bucket=self.bucket, Key=obj)
+            if json.loads(current['Body'].read()).get('owner') != self.owner or current['ETag'] != held['etag']: return
+            self.s3.delete_object(Bucket=self.bucket, Key=obj, IfMatch=held['etag'])
+        except Exception as e:
+            if self._code(e) not in (*self.CONFLICT, '404', 'NoSuchKey'): log.warning('Lepas lock %s gagal: %s', key, e)
+
+
+def open_store(url, **kw):
+    """None (single node), file:///shared/dir or a plain path, or s3://bucket/prefix."""
+    if not url: return None
+    parsed = urlparse(url)
+    if parsed.scheme == 's3': return S3Store(parsed.netloc, parsed.path, os.environ.get('ARTIFACT_STORE_ENDPOINT'), **kw)
+    if parsed.scheme in ('', 'file'): return LocalStore(parsed.path if parsed.scheme else url, **kw)
+    raise ValueError(f'ARTIFACT_STORE tidak didukung: {url}')
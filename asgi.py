@@ -0,0 +1,251 @@
+# asyncio serving mode for the same routes as server.py:
+#   pip install uvicorn && uvicorn asgi:app --port 3001
+# Blocking yt-dlp work runs on a bounded executor, so slow upstream calls occupy a worker slot
+# instead of a connection's thread; downloads get executor slots of their own, so a few slow ones
+# never hold up suggest and search. Work that has not started yet is dropped when the client
+# disconnects, a download nobody else is waiting for is aborted from its progress hook, and
+# responses being sent stop reading their file or stream.
+import asyncio, json, os, re, time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import parse_qs
+import server, json_response
+from download_cache import video_id_from_url
+from metrics import current_route
+
+executor = ThreadPoolExecutor(int(os.environ.get('ASGI_WORKERS', 32)), thread_name_prefix='asgi')
+download_executor = ThreadPoolExecutor(int(os.environ.get('ASGI_DOWNLOAD_WORKERS', 8)), thread_name_prefix='asgi-download')
+file_executor = ThreadPoolExecutor(8, thread_name_prefix='asgi-file')
+CHUNK_SIZE = 256 * 1024
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)$')
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class CancelToken:
+    # Passed to produce_artifact as its job; aborts the fetch once the client is gone, unless other
+    # requests have joined the same single-flight download or a source fetch nested in it
+    def __init__(self, key):
+        self.key, self.cancelled, self.progress = key, False, {}
+
+    def progress_hook(self, d):
+        if self.cancelled and not server.download_flights.shared(self.key):
+            raise ClientDisconnected('Klien terputus, download dibatalkan')
+
+    def postprocessor_hook(self, d): pass
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect': pass
+
+async def run_blocking(receive, fn, *args, on_disconnect=None, pool=executor):
+    loop = asyncio.get_running_loop()
+    work = loop.run_in_executor(pool, copy_context().run, fn, *args)
+    watch = asyncio.ensure_future(wait_disconnect(receive))
+    await asyncio.wait({work, watch}, return_when=asyncio.FIRST_COMPLETED)
+    if work.done():
+        watch.cancel()
+        return work.result()
+    work.cancel()   # only succeeds while still queued
+    if on_disconnect: on_disconnect()
+    raise ClientDisconnected()
+
+async def send_body(send, status, body, content_type, headers=()):
+    length = [] if status == 304 else [(b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', content_type.encode()), *length, *headers]})
+    await send({'type': 'http.response.body', 'body': body})
+    server.bytes_served.inc(len(body), route=current_route.get())
+
+async def send_chunks(receive, send, status, chunks, content_type, headers=()):
+    # Streams a text iterator whose next() may block on extraction, so each step runs on the executor.
+    # Once the client is gone no further step is asked for (send() would just drop what it yields).
+    loop = asyncio.get_running_loop()
+    watch = asyncio.ensure_future(wait_disconnect(receive))
+    step = None
+    def close(done=None):
+        if done and not done.cancelled(): done.exception()   # seen here; the client is gone
+        try: chunks.close()
+        except ValueError: pass   # still running in the executor when the request was cancelled
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', content_type.encode()), *headers]})
+    try:
+        while True:
+            step = loop.run_in_executor(executor, copy_context().run, next, chunks, None)
+            await asyncio.wait({step, watch}, return_when=asyncio.FIRST_COMPLETED)
+            if watch.done(): raise ClientDisconnected()
+            if (chunk := step.result()) is None: break
+            body = chunk.encode()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            server.bytes_served.inc(len(body), route=current_route.get())
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watch.cancel()
+        # A step cannot be interrupted, so the iterator is closed as soon as the one in progress returns
+        if step is None or step.done(): close()
+        else: step.add_done_callback(close)
+
+def header_list(headers): return [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+
+async def send_api_json(scope, send, data, headers=()):
+    # Same response layer as server.api_json: ETag/304 and compression
+    with server.stage('serialize'): body = json_response.dumps(data)
+    req = dict(scope['headers'])
+    with server.stage('compress'):
+        status, body, extra = json_response.conditional(body, req.get(b'if-none-match', b'').decode(),
+                                                        req.get(b'accept-encoding', b'').decode())
+    await send_body(send, status, body, 'application/json', [*header_list(extra), *headers])
+
+async def send_json(send, data, status=200, headers=()):
+    with server.stage('serialize'): body = json.dumps(data).encode()
+    await send_body(send, status, body, 'application/json', headers)
+
+async def send_artifact(scope, receive, send, entry):
+    path = os.path.abspath(server.download_cache.path(entry))
+    size = os.path.getsize(path)
+    ext = entry['file'].rsplit('.', 1)[-1]
+    start, end, status = 0, size - 1, 200
+    headers = dict(scope['headers'])
+    etag = f'"{entry["sha256"]}"'
+    if etag in headers.get(b'if-none-match', b'').decode():
+        return await send_body(send, 304, b'', 'application/octet-stream', [(b'etag', etag.encode())])
+    m = RANGE_RE.match(headers.get(b'range', b'').decode())
+    # If-Range: only honour the range when the client's copy is still this exact artifact
+    if_range = headers.get(b'if-range', b'').decode()
+    if m and (m.group(1) or m.group(2)) and (not if_range or if_range == etag):
+        if m.group(1): start, end = int(m.group(1)), min(int(m.group(2) or end), end)
+        else: start = max(size - int(m.group(2)), 0)
+        if start > end:
+            return await send_body(send, 416, b'', 'text/plain', [(b'content-range', f'bytes */{size}'.encode())])
+        status = 206
+    extra = [(b'content-range', f'bytes {start}-{end}/{size}'.encode())] if status == 206 else []
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/octet-stream'), (b'content-length', str(end - start + 1).encode()),
+        (b'accept-ranges', b'bytes'), (b'etag', etag.encode()),
+        (b'content-disposition', server.attachment_header(f"{entry['title']}.{ext}").encode()), *extra]})
+    loop = asyncio.get_running_loop()
+    began = time.perf_counter()
+    # Stops reading (and unpins the file) once the client is gone, rather than reading it all into a closed socket
+    watch = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        with server.download_cache.pinned(entry), open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await loop.run_in_executor(file_executor, f.read, min(CHUNK_SIZE, remaining))
+                if not chunk: break
+                if watch.done(): raise ClientDisconnected()
+                remaining -= len(chunk)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+                server.bytes_served.inc(len(chunk), route=current_route.get())
+    finally:
+        watch.cancel()
+    server.stage_seconds.observe(time.perf_counter() - began, route=current_route.get(), stage='send_file')
+
+
+async def index(scope, receive, send, args):
+    body, etag = server.index_page(server.app)
+    headers = [(b'etag', f'"{etag}"'.encode()), (b'cache-control', b'no-cache')]
+    if f'"{etag}"' in dict(scope['headers']).get(b'if-none-match', b'').decode():
+        return await send_body(send, 304, b'', 'text/html; charset=utf-8', headers)
+    await send_body(send, 200, body, 'text/html; charset=utf-8', headers)
+
+async def suggest(scope, receive, send, args):
+    if not args.get('q'): return await send_json(send, { 'error': "Parameter 'q' diperlukan" }, 400)
+    await send_api_json(scope, send, await run_blocking(receive, server.suggest_titles, args['q']))
+
+async def search(scope, receive, send, args):
+    if not args.get('q'): return await send_json(send, { 'error': "Parameter 'q' diperlukan" }, 400)
+    try: cursor, limit = server.page_args(args)
+    except ValueError: return await send_json(send, { 'error': server.page_args_error() }, 400)
+    server.app.logger.info(f"Mencari video: {args['q']}")
+    mode = server.stream_mode(args, dict(scope['headers']).get(b'accept', b'').decode())
+    if mode:
+        content_type, encode = server.STREAM_TYPES[mode]
+        return await send_chunks(receive, send, 200, encode(server.search_events(args['q'], cursor, limit)), content_type,
+                                 header_list(server.STREAM_HEADERS))
+    results, next_cursor = await run_blocking(receive, server.search_page, args['q'], cursor, limit)
+    await send_api_json(scope, send, results, header_list(server.next_page_headers(args['q'], limit, next_cursor)))
+
+async def random_suggestions(scope, receive, send, args):
+    await send_api_json(scope, send, await run_blocking(receive, server.random_results))
+
+async def download(scope, receive, send, args):
+    url = args.get('url')
+    if not url: return await send_json(send, { 'error': "Parameter 'url' diperlukan" }, 400)
+    try: fmt, quality, policy = server.requested_format(args)
+    except ValueError: return await send_json(send, { 'error': "Parameter 'max_height'/'max_bytes' harus angka" }, 400)
+    token = CancelToken(server.download_key(url, fmt, quality, video_id_from_url(url)))
+    def cancel(): token.cancelled = True
+    for attempt in range(3):
+        try:
+            entry = await run_blocking(receive, server.get_artifact, url, fmt, quality, policy, token, on_disconnect=cancel,
+                                       pool=download_executor)
+            break
+        except ClientDisconnected:
+            # A flight we waited on was aborted for another request's client; ours still wants the file
+            if token.cancelled or attempt == 2: raise
+    await send_artifact(scope, receive, send, entry)
+
+async def formats(scope, receive, send, args):
+    url = args.get('url')
+    if not url: return await send_json(send, { 'error': "Parameter 'url' diperlukan" }, 400)
+    try: fmt, quality, policy = server.requested_format(args)
+    except ValueError: return await send_json(send, { 'error': "Parameter 'max_height'/'max_bytes' harus angka" }, 400)
+    await send_api_json(scope, send, await run_blocking(receive, server.ranked_formats, url, fmt, quality, policy))
+
+async def thumbnail(scope, receive, send, args):
+    video_id, size = scope['path'].rsplit('/', 1)[-1], args.get('size', server.app.config['THUMB_SIZE'])
+    if size not in server.THUMB_SIZES or video_id_from_url(video_id) != video_id:
+        return await send_json(send, { 'error': 'Thumbnail tidak valid' }, 400)
+    try: path = await run_blocking(receive, server.thumb_cache.get, video_id, size)
+    except server.ThumbNotFound: return await send_json(send, { 'error': 'Thumbnail tidak ditemukan' }, 404)
+    def read():
+        with open(path, 'rb') as f: return f.read()
+    body = await asyncio.get_running_loop().run_in_executor(file_executor, read)
+    await send_body(send, 200, body, 'image/jpeg',
+                    [(b'cache-control', f'public, max-age={server.THUMB_MAX_AGE}, immutable'.encode())])
+
+async def metrics(scope, receive, send, args):
+    await send_body(send, 200, server.registry.render().encode(), 'text/plain; version=0.0.4')
+
+ROUTES = { '/': index, '/api/suggest': suggest, '/api/search': search,
+           '/api/random_suggestions': random_suggestions, '/api/download': download, '/api/formats': formats,
+           '/metrics': metrics }
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            msg = await receive()
+            if msg['type'] == 'lifespan.startup': await send({'type': 'lifespan.startup.complete'})
+            elif msg['type'] == 'lifespan.shutdown':
+                for pool in (executor, download_executor): pool.shutdown(wait=False, cancel_futures=True)
+                return await send({'type': 'lifespan.shutdown.complete'})
+    if scope['type'] != 'http': return
+    handler = ROUTES.get(scope['path'])
+    route = scope['path'] if handler else 'unmatched'
+    if handler is None and scope['path'].startswith('/api/thumb/'):
+        handler, route = thumbnail, '/api/thumb/<video_id>'
+    current_route.set(route)
+    start, status = time.perf_counter(), [None]
+    async def send_tracked(msg):
+        if msg['type'] == 'http.response.start': status[0] = msg['status']
+        await send(msg)
+    try:
+        if handler is None: await send_json(send_tracked, { 'error': 'Not found' }, 404)
+        else:
+            args = { k: v[-1] for k, v in parse_qs(scope['query_string'].decode()).items() }
+            await handler(scope, receive, send_tracked, args)
+    except ClientDisconnected:
+        status[0] = 499
+    except Exception as e:
+        server.errors_total.inc(route=route, exception=type(e).__name__)
+        if status[0] is not None: server.app.logger.error(f"Error setelah respons dimulai: {e}")
+        elif isinstance(e, (server.UpstreamBusy, server.UpstreamThrottled)):
+            body = json.dumps({ 'error': str(e) }).encode()
+            await send_body(send_tracked, 503, body, 'application/json', [(b'retry-after', str(server.upstream.retry_after()).encode())])
+        else: await send_json(send_tracked, { 'error': str(e) }, 500)
+    finally:
+        server.http_latency.observe(time.perf_counter() - start, route=route)
+        server.http_requests.inc(route=route, method=scope['method'], status=status[0] or 500)
@@ -0,0 +1,96 @@
+# Deterministic stand-in for yt_dlp.YoutubeDL so benchmarks run without the network.
+# Latencies come from FAKE_SEARCH_LATENCY / FAKE_EXTRACT_LATENCY (seconds) and downloads
+# write FAKE_DOWNLOAD_BYTES bytes at FAKE_DOWNLOAD_BPS bytes/second.
+import hashlib, os, time
+
+SEARCH_LATENCY = float(os.environ.get('FAKE_SEARCH_LATENCY', 0.3))
+EXTRACT_LATENCY = float(os.environ.get('FAKE_EXTRACT_LATENCY', 0.5))
+DOWNLOAD_BYTES = int(os.environ.get('FAKE_DOWNLOAD_BYTES', 2 * 1024 * 1024))
+DOWNLOAD_BPS = float(os.environ.get('FAKE_DOWNLOAD_BPS', 20 * 1024 * 1024))
+# ytsearchall: results come SEARCH_PAGE at a time, up to SEARCH_MAX
+SEARCH_PAGE, SEARCH_MAX = 20, 400
+
+# format_id, ext, vcodec, acodec, height, tbr (kbit/s), shaped like a typical YouTube listing
+FORMATS = [('139', 'm4a', 'none', 'mp4a.40.5', None, 48), ('140', 'm4a', 'none', 'mp4a.40.2', None, 129),
+           ('249', 'webm', 'none', 'opus', None, 50), ('251', 'webm', 'none', 'opus', None, 135),
+           ('18', 'mp4', 'avc1.42001E', 'mp4a.40.2', 360, 500), ('22', 'mp4', 'avc1.64001F', 'mp4a.40.2', 720, 1500)]
+
+def fake_id(text): return hashlib.sha1(text.encode()).hexdigest()[:11]
+
+
+class FakeYoutubeDL:
+    def __init__(self, params=None):
+        self.params = params or {}
+        fmt = self.params.get('format')
+        self.format_selector = fmt if callable(fmt) else None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+    def close(self): pass
+
+    def _entry(self, query, i):
+        return { 'id': fake_id(f'{query}/{i}'), 'title': f'{query} video {i}', 'uploader': f'channel {i % 7}',
+                 'url': f'https://www.youtube.com/watch?v={fake_id(f"{query}/{i}")}',
+                 'thumbnails': [{ 'url': f'https://i.ytimg.com/vi/{fake_id(f"{query}/{i}")}/hqdefault.jpg' }] }
+
+    def _pages(self, query):
+        # Like yt-dlp's search generator: each continuation page of SEARCH_PAGE results costs one upstream call
+        for page in range(SEARCH_MAX // SEARCH_PAGE):
+            time.sleep(SEARCH_LATENCY)
+            for i in range(page * SEARCH_PAGE, (page + 1) * SEARCH_PAGE): yield self._entry(query, i)
+
+    def _channel(self, url):
+        # Like yt-dlp on a channel root: one nested playlist per tab. A tab URL lists just that tab.
+        root, _, tab = url.rstrip('/').partition('/@')[2].partition('/')
+        def listing(name, n):
+            return { '_type': 'playlist', 'id': f'{root}-{name}', 'title': f'{root} - {name}',
+                     'webpage_url': f'https://www.youtube.com/@{root}/{name}',
+                     'entries': [self._entry(f'{root}/{name}', i) for i in range(n)] }
+        tabs = { 'videos': 5, 'shorts': 3, 'streams': 2 }
+        time.sleep(SEARCH_LATENCY)
+        if tab in tabs: return listing(tab, tabs[tab])
+        return { '_type': 'playlist', 'id': root, 'title': root, 'entries': [listing(t, n) for t, n in tabs.items()] }
+
+    def extract_info(self, url, download=False, process=True):
+        if '/@' in url: return self._channel(url)
+        search = self.params.get('default_search', '')
+        if url.startswith('ytsearch'): search, url = url.split(':', 1)[0] + ':', url.split(':', 1)[1]
+        if search.startswith('ytsearch') and '://' not in url:
+            n = search[len('ytsearch'):-1] or '1'
+            if n == 'all': return { '_type': 'playlist', 'id': url, 'title': url, 'entries': self._pages(url) }
+            time.sleep(SEARCH_LATENCY)
+            return { '_type': 'playlist', 'id': url, 'title': url, 'entries': [self._entry(url, i) for i in range(int(n))] }
+        time.sleep(EXTRACT_LATENCY)
+        vid = url.rsplit('v=', 1)[-1][:11] if 'v=' in url else fake_id(url)
+        formats = [{ 'format_id': fid, 'ext': ext, 'vcodec': vcodec, 'acodec': acodec, 'height': height, 'tbr': tbr,
+                     'abr': tbr if vcodec == 'none' else None, 'filesize_approx': tbr * 180 * 125, 'protocol': 'https',
+                     'url': f'https://example.invalid/{vid}/{fid}?expire={int(time.time()) + 21600}', 'http_headers': {} }
+                   for fid, ext, vcodec, acodec, height, tbr in FORMATS]
+        if self.format_selector: chosen = next(iter(self.format_selector({ 'formats': formats })))
+        else: chosen = formats[1 if 'audio' in str(self.params.get('format')) else -1]
+        # Every format downloads as FAKE_DOWNLOAD_BYTES, whatever its nominal bitrate
+        info = { 'id': vid, 'title': f'Video {vid}', 'duration': 180, 'formats': formats, **chosen, 'filesize': DOWNLOAD_BYTES }
+        return self.process_ie_result(info, download) if download else info
+
+    def process_ie_result(self, info, download=True, extra_info=None):
+        if not download: return info
+        path = self.prepare_filename(info)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        block = hashlib.sha256(info['id'].encode()).digest() * 2048   # 64 KiB
+        written, start = 0, time.perf_counter()
+        with open(path + '.part', 'wb') as f:
+            while written < DOWNLOAD_BYTES:
+                n = min(len(block), DOWNLOAD_BYTES - written)
+                f.write(block[:n])
+                written += n
+                for hook in self.params.get('progress_hooks', []):
+                    hook({ 'status': 'downloading', 'downloaded_bytes': written, 'total_bytes': DOWNLOAD_BYTES })
+                lag = written / DOWNLOAD_BPS - (time.perf_counter() - start)
+                if lag > 0: time.sleep(lag)
+        os.replace(path + '.part', path)
+        return info
+
+    def prepare_filename(self, info):
+        tmpl = self.params.get('outtmpl', '%(title)s.%(ext)s')
+        if isinstance(tmpl, dict): tmpl = tmpl['default']
+        return tmpl % { 'id': info['id'], 'title': info['title'], 'ext': info['ext'], 'format_id': info.get('format_id') }
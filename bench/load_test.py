@@ -0,0 +1,118 @@
+# Load-test comparison of the Flask server and the ASGI variant against the fake backend.
+#   python bench/load_test.py [-c 100] [-n 2000] [--path "/api/search?q=..."] [--targets flask asgi]
+# Each target is started in a subprocess (Flask's threaded server / uvicorn) with YoutubeDL replaced by
+# bench/fake_ydl.py and ffmpeg by bench/fake_ffmpeg; unique queries per request ({i}, or {vid} for an
+# 11-character video id) defeat the caches so every call pays upstream latency.
+import argparse, asyncio, json, os, socket, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVE = '''
+import sys; sys.path[:0] = [{root!r}, {bench!r}]
+import server, fake_ydl
+server.ydl_pool.factory = fake_ydl.FakeYoutubeDL
+server.app.logger.setLevel('WARNING')
+if {target!r} == 'flask':
+    import logging; logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server.app.run(port={port}, threaded=True)
+else:
+    import uvicorn, asgi
+    uvicorn.run(asgi.app, port={port}, log_level='warning', backlog=2048)
+'''
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_ready(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2): return
+        except OSError: time.sleep(0.1)
+    raise RuntimeError(f'server on {port} did not start')
+
+async def fetch(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return int(data.split(b' ', 2)[1])
+
+# The limiter's production defaults would make every run measure UPSTREAM_RATE instead of the server
+BENCH_ENV = { 'UPSTREAM_RATE': '100000', 'UPSTREAM_BURST': '100000', 'PATH': os.path.join(ROOT, 'bench', 'fake_ffmpeg') }
+
+def server_env(**extra):
+    env = { **os.environ, **BENCH_ENV, **extra }
+    env['PATH'] = f"{BENCH_ENV['PATH']}{os.pathsep}{os.environ.get('PATH', '')}"
+    return env
+
+def proc_status(pid):
+    # Linux only: peak-relevant fields from /proc/<pid>/status, plus the open descriptor count
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            fields = dict(line.split(':', 1) for line in f)
+        return int(fields['Threads']), int(fields['VmRSS'].split()[0]) // 1024, len(os.listdir(f'/proc/{pid}/fd'))
+    except (OSError, KeyError, ValueError):
+        return None, None, None
+
+async def sample_proc(pid, peak):
+    while True:
+        threads, rss, fds = proc_status(pid)
+        if threads:
+            peak['threads'], peak['rss_mb'] = max(peak['threads'], threads), max(peak['rss_mb'], rss)
+            peak['fds'] = max(peak['fds'], fds)
+        await asyncio.sleep(0.05)
+
+def expand(path, i): return path.replace('{i}', str(i)).replace('{vid}', f'b{i:010d}')
+
+async def run_load(port, path, concurrency, total, pid):
+    latencies, statuses, counter = [], {}, iter(range(total))
+    peak = {'threads': 0, 'rss_mb': 0, 'fds': 0}
+    sampler = asyncio.ensure_future(sample_proc(pid, peak))
+    async def client():
+        for i in counter:
+            t = time.perf_counter()
+            try: status = await fetch(port, expand(path, i))
+            except OSError: status = 'conn-error'
+            latencies.append(time.perf_counter() - t)
+            statuses[status] = statuses.get(status, 0) + 1
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    sampler.cancel()
+    return latencies, statuses, time.perf_counter() - start, peak
+
+def summarize(latencies, statuses, elapsed, peak):
+    lat = sorted(latencies)
+    pct = lambda p: round(lat[min(len(lat) - 1, int(len(lat) * p))] * 1000, 1)
+    return { 'requests': len(lat), 'seconds': round(elapsed, 2), 'rps': round(len(lat) / elapsed, 1),
+             'p50_ms': pct(.5), 'p95_ms': pct(.95), 'p99_ms': pct(.99), 'statuses': statuses,
+             'peak_threads': peak['threads'], 'peak_rss_mb': peak['rss_mb'], 'peak_fds': peak['fds'] }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-c', '--concurrency', type=int, default=100)
+    ap.add_argument('-n', '--requests', type=int, default=2000)
+    ap.add_argument('--path', default='/api/search?q=bench+{i}')
+    ap.add_argument('--targets', nargs='+', default=['flask', 'asgi'])
+    ap.add_argument('--asgi-workers', type=int, default=32, help='ASGI_WORKERS for the asgi target')
+    args = ap.parse_args()
+    results = {}
+    for target in args.targets:
+        port = free_port()
+        workdir = tempfile.mkdtemp(prefix=f'bench-{target}-')
+        code = SERVE.format(root=ROOT, bench=os.path.join(ROOT, 'bench'), target=target, port=port)
+        env = server_env(ASGI_WORKERS=str(args.asgi_workers))
+        proc = subprocess.Popen([sys.executable, '-c', code], cwd=workdir, env=env)
+        try:
+            wait_ready(port)
+            results[target] = summarize(*asyncio.run(run_load(port, args.path, args.concurrency, args.requests, proc.pid)))
+        finally:
+            proc.terminate()
+            proc.wait()
+    print(json.dumps({ 'concurrency': args.concurrency, 'path': args.path, 'asgi_workers': args.asgi_workers,
+                       'results': results }, indent=2))
+
+if __name__ == '__main__':
+    main()
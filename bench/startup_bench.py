@@ -0,0 +1,44 @@
+# Cold-start cost of the app: import, first page view, a repeat view, and the first API call.
+#   python bench/startup_bench.py [-n 10] [--ui grid]
+# Every run is a fresh interpreter in a scratch directory. The first API call uses a flat search whose
+# extract_info is never reached (the pool is only asked for an instance), so only yt-dlp's import and
+# YoutubeDL construction are measured, without network access.
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBE = '''
+import sys, time, json
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import server
+t1 = time.perf_counter()
+client = server.app.test_client()
+first = client.get('/')
+t2 = time.perf_counter()
+again = client.get('/', headers={{'If-None-Match': first.headers['ETag']}})
+t3 = time.perf_counter()
+ytdlp_after_page = 'yt_dlp' in sys.modules
+with server.ydl_pool.checkout('flat-search-5'): pass
+t4 = time.perf_counter()
+print(json.dumps({{'import_ms': (t1 - t0) * 1000, 'first_page_ms': (t2 - t1) * 1000, 'cached_page_ms': (t3 - t2) * 1000,
+                  'first_ydl_ms': (t4 - t3) * 1000, 'page_status': first.status_code, 'revalidate_status': again.status_code,
+                  'yt_dlp_loaded_by_page': ytdlp_after_page}}))
+'''
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=10)
+    ap.add_argument('--ui', default='grid', help='UI_VARIANT to render')
+    args = ap.parse_args()
+    runs = []
+    for _ in range(args.n):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(root=ROOT)], cwd=tempfile.mkdtemp(prefix='startup-'),
+                             env={**os.environ, 'UI_VARIANT': args.ui}, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    summary = {k: round(statistics.median(r[k] for r in runs), 2) for k in runs[0] if k.endswith('_ms')}
+    print(json.dumps({'ui': args.ui, 'runs': args.n, 'median': summary,
+                      'statuses': sorted({(r['page_status'], r['revalidate_status']) for r in runs}),
+                      'yt_dlp_loaded_by_page': any(r['yt_dlp_loaded_by_page'] for r in runs)}, indent=2))
+
+if __name__ == '__main__':
+    main()
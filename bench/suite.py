@@ -0,0 +1,92 @@
+# Offline benchmark suite: every public route against the fake YoutubeDL/ffmpeg backend, results as JSON.
+#   python bench/suite.py [-c 20] [-n 300] [--routes search download_mp3] [--target flask|asgi]
+#                         [--out results.json] [--baseline previous.json] [--tolerance 0.25]
+# One server subprocess serves all routes in turn; each route reports p50/p95/p99 latency, throughput
+# and the server's peak threads, RSS and open fds while it ran. With --baseline the run fails (exit 1)
+# when a route's p95 or throughput regressed by more than --tolerance.
+import argparse, asyncio, json, os, platform, subprocess, sys, tempfile, time
+from load_test import ROOT, SERVE, free_port, run_load, server_env, summarize, wait_ready
+
+# {i} makes a request unique (a cache miss); a fixed path measures the warm/cached path
+ROUTES = {
+    'search': '/api/search?q=bench+{i}',
+    'search_cached': '/api/search?q=bench',
+    'search_page2': '/api/search?q=bench+{i}&cursor=10',
+    'search_stream': '/api/search?q=bench+{i}&stream=1',
+    'suggest': '/api/suggest?q=bench+{i}',
+    'random': '/api/random_suggestions',
+    'download': '/api/download?url=https://www.youtube.com/watch?v={vid}&format=mp4',
+    'download_cached': '/api/download?url=https://www.youtube.com/watch?v=b0000000000&format=mp4',
+    'download_mp3': '/api/download?url=https://www.youtube.com/watch?v={vid}&format=mp3&quality=192',
+    'download_capped': '/api/download?url=https://www.youtube.com/watch?v={vid}&format=mp4&max_height=480',
+    'formats': '/api/formats?url=https://www.youtube.com/watch?v={vid}&format=opus',
+    # The fake channel root lists its Videos/Shorts/Live tabs as nested playlists (10 videos in all)
+    'download_channel': '/api/download/playlist?url=https://www.youtube.com/@bench{i}&format=m4a',
+}
+# Downloads write real files; fewer of them keeps a run short and the scratch folder small
+HEAVY = ('download', 'download_mp3', 'download_capped', 'download_channel')
+# Routes asgi.py does not serve
+FLASK_ONLY = ('download_channel',)
+
+def git_revision():
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError: return None
+
+def regressions(results, baseline, tolerance):
+    out = []
+    for route, r in results.items():
+        b = baseline.get('results', {}).get(route)
+        if not b: continue
+        if r['p95_ms'] > b['p95_ms'] * (1 + tolerance): out.append(f"{route}: p95 {b['p95_ms']} -> {r['p95_ms']} ms")
+        if r['rps'] < b['rps'] * (1 - tolerance): out.append(f"{route}: rps {b['rps']} -> {r['rps']}")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-c', '--concurrency', type=int, default=20)
+    ap.add_argument('-n', '--requests', type=int, default=300)
+    ap.add_argument('--heavy-requests', type=int, default=60, help='requests for uncached download routes')
+    ap.add_argument('--routes', nargs='+', choices=list(ROUTES), default=list(ROUTES))
+    ap.add_argument('--target', choices=['flask', 'asgi'], default='flask')
+    ap.add_argument('--search-latency', default='0.05', help='FAKE_SEARCH_LATENCY seconds')
+    ap.add_argument('--extract-latency', default='0.05', help='FAKE_EXTRACT_LATENCY seconds')
+    ap.add_argument('--download-bytes', default=str(512 * 1024), help='FAKE_DOWNLOAD_BYTES per artifact')
+    ap.add_argument('--transcode-bps', default=str(16 * 1024 * 1024), help='FAKE_TRANSCODE_BPS (bytes per CPU-second)')
+    ap.add_argument('--out', help='also write the JSON report to this file')
+    ap.add_argument('--baseline', help='earlier report to compare against')
+    ap.add_argument('--tolerance', type=float, default=0.25)
+    args = ap.parse_args()
+
+    port = free_port()
+    code = SERVE.format(root=ROOT, bench=os.path.join(ROOT, 'bench'), target=args.target, port=port)
+    env = server_env(FAKE_SEARCH_LATENCY=args.search_latency, FAKE_EXTRACT_LATENCY=args.extract_latency,
+                     FAKE_DOWNLOAD_BYTES=args.download_bytes, FAKE_TRANSCODE_BPS=args.transcode_bps)
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=tempfile.mkdtemp(prefix='bench-suite-'), env=env)
+    results = {}
+    try:
+        wait_ready(port)
+        for route in args.routes:
+            if args.target == 'asgi' and route in FLASK_ONLY: continue
+            total = args.heavy_requests if route in HEAVY else args.requests
+            results[route] = summarize(*asyncio.run(run_load(port, ROUTES[route], args.concurrency, total, proc.pid)))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    report = { 'revision': git_revision(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+               'target': args.target, 'concurrency': args.concurrency,
+               'fake': { 'search_latency': float(args.search_latency), 'extract_latency': float(args.extract_latency),
+                         'download_bytes': int(args.download_bytes), 'transcode_bps': int(args.transcode_bps) },
+               'results': results }
+    failed = []
+    if args.baseline:
+        with open(args.baseline) as f: failed = regressions(results, json.load(f), args.tolerance)
+        report['regressions'] = failed
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, 'w') as f: f.write(text + '\n')
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# Per-request YoutubeDL overhead: a fresh instance per request vs a pooled checkout.
+#   python bench/ydl_pool_bench.py [-n 200] [--query "lofi"]
+# Without --query nothing touches the network; only construction/teardown is timed.
+import argparse, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yt_dlp import YoutubeDL
+from ydl_pool import YdlPool, flat_search_opts
+
+def timed(n, fn):
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    return {'mean_ms': sum(samples) / n * 1000, 'p50_ms': samples[n // 2] * 1000,
+            'p95_ms': samples[int(n * 0.95) - 1] * 1000}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-n', type=int, default=200)
+    ap.add_argument('--query', help='also time a real flat search through each path')
+    args = ap.parse_args()
+    opts = flat_search_opts(5)
+    pool = YdlPool({'flat-search-5': opts})
+    pool.warm()
+
+    def fresh():
+        with YoutubeDL(opts) as ydl:
+            if args.query: ydl.extract_info(args.query, download=False)
+
+    def pooled():
+        with pool.checkout('flat-search-5') as ydl:
+            if args.query: ydl.extract_info(args.query, download=False)
+
+    n = args.n if not args.query else min(args.n, 10)
+    a, b = timed(n, fresh), timed(n, pooled)
+    print(f"{'':8}{'mean':>10}{'p50':>10}{'p95':>10}  (ms, n={n})")
+    for name, r in (('fresh', a), ('pooled', b)):
+        print(f"{name:8}{r['mean_ms']:10.3f}{r['p50_ms']:10.3f}{r['p95_ms']:10.3f}")
+    print(f"saved per request: {a['mean_ms'] - b['mean_ms']:.3f} ms")
+
+if __name__ == '__main__':
+    main()
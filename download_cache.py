@@ -0,0 +1,186 @@
+import hashlib, json, os, re, threading, time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+# watch?v=ID, youtu.be/ID, /shorts/ID, /embed/ID, /live/ID or a bare 11-char ID
+VIDEO_ID_RE = re.compile(r'(?:v=|youtu\.be/|/shorts/|/embed/|/live/|^)([0-9A-Za-z_-]{11})(?:[&?#/]|$)')
+
+def video_id_from_url(url):
+    m = VIDEO_ID_RE.search(url.strip())
+    return m.group(1) if m else None
+
+def file_hash(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''): h.update(chunk)
+    return h.hexdigest()
+
+
+class DownloadCache:
+    """On-disk artifact cache keyed by video id + format + quality.
+
+    Artifacts live in ``folder``; the index (key -> file, size, title, last use)
+    is persisted as JSON next to them so hits survive restarts. Entries are
+    kept in LRU order and evicted once the total size exceeds ``max_bytes``.
+    Files pinned with ``pinned(entry)`` (being sent or read) are never evicted
+    by this process. Several keys may name one file (policies that pick the
+    same stream); it is counted once and deleted with the last of them.
+    """
+
+    INDEX_NAME = '.cache_index.json'
+
+    def __init__(self, folder, max_bytes=2 * 1024**3, flush_interval=5.0):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.index_path = os.path.join(folder, self.INDEX_NAME)
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()
+        self.pins = Counter()          # file name -> readers currently using it
+        self.hits = self.misses = self.evictions = 0
+        self._dirty = False
+        self._last_flush = 0.0
+        self._index_mtime = 0.0
+        self._load()
+
+    @staticmethod
+    def key(video_id, fmt, quality): return f'{video_id}:{fmt}:{quality}'
+
+    def _read_index(self):
+        try:
+            self._index_mtime = os.path.getmtime(self.index_path)
+            with open(self.index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self):
+        # Merges entries written by other processes sharing the folder.
+        # Unknown entries are prepended newest-first so the oldest ends up at the LRU end.
+        data = self._read_index()
+        for key, entry in sorted(data.items(), key=lambda kv: kv[1].get('atime', 0), reverse=True):
+            if key not in self.entries and os.path.isfile(os.path.join(self.folder, entry['file'])):
+                self.entries[key] = entry
+                self.entries.move_to_end(key, last=False)
+
+    def _index_changed(self):
+        try: return os.path.getmtime(self.index_path) > self._index_mtime
+        except OSError: return False
+
+    def _flush(self, force=False):
+        if not self._dirty or (not force and time.time() - self._last_flush < self.flush_interval): return
+        if self._index_changed(): self._load()
+        tmp = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.index_path)
+        self._index_mtime = os.path.getmtime(self.index_path)
+        self._dirty, self._last_flush = False, time.time()
+
+    def path(self, entry): return os.path.join(self.folder, entry['file'])
+
+    def get(self, key, count=True):
+        with self.lock:
+            if key not in self.entries and self._index_changed(): self._load()
+            entry = self.entries.get(key)
+            if entry and not os.path.isfile(self.path(entry)):
+                del self.entries[key]
+                self._dirty, entry = True, None
+            if entry is None:
+                if count: self.misses += 1
+                return None
+            if count:
+                self.hits += 1
+                entry['served'] = entry.get('served', 0) + 1
+            entry['atime'] = time.time()
+            self.entries.move_to_end(key)
+            self._dirty = True
+            self._flush()
+            entry = dict(entry)
+        # Entries indexed before content hashes existed get one on first use
+        if 'sha256' not in entry:
+            entry['sha256'] = file_hash(self.path(entry))
+            with self.lock:
+                if key in self.entries: self.entries[key]['sha256'] = entry['sha256']
+        return entry
+
+    def put(self, key, path, title, sha256=None):
+        # The content hash backs the ETag, so Range/If-Range stay valid across restarts and replicas
+        size = os.path.getsize(path)
+        sha256 = sha256 or file_hash(path)
+        with self.lock:
+            self.entries[key] = {'file': os.path.basename(path), 'size': size, 'title': title, 'atime': time.time(),
+                                 'sha256': sha256}
+            self.entries.move_to_end(key)
+            self._dirty = True
+            self._evict(keep=key)
+            self._flush(force=True)
+            return dict(self.entries[key])
+
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry:
+                self._dirty = True
+                self._flush(force=True)
+            return entry
+
+    def pin(self, entry):
+        with self.lock: self.pins[entry['file']] += 1
+
+    def unpin(self, entry):
+        with self.lock:
+            self.pins[entry['file']] -= 1
+            if self.pins[entry['file']] <= 0: del self.pins[entry['file']]
+
+    @contextmanager
+    def pinned(self, entry):
+        self.pin(entry)
+        try: yield entry
+        finally: self.unpin(entry)
+
+    def _bytes(self):
+        # Caller holds the lock
+        return sum({e['file']: e['size'] for e in self.entries.values()}.values())
+
+    def _remove(self, key):
+        # Caller holds the lock; returns the bytes freed, none while another key still names the file
+        entry = self.entries.pop(key)
+        self.evictions += 1
+        self._dirty = True
+        if any(e['file'] == entry['file'] for e in self.entries.values()): return 0
+        try: os.remove(self.path(entry))
+        except OSError: pass
+        return entry['size']
+
+    def _evict(self, keep=None):
+        total = self._bytes()
+        for key in list(self.entries):
+            if total <= self.max_bytes: break
+            if key == keep or self.entries[key]['file'] in self.pins: continue
+            total -= self._remove(key)
+
+    def shrink(self, nbytes, policy='lru'):
+        """Evicts unpinned entries until ``nbytes`` are freed, least recently used first or,
+        with policy='lfu', least often served first. Returns the bytes freed."""
+        with self.lock:
+            if self._index_changed(): self._load()
+            keys = list(self.entries)
+            if policy == 'lfu': keys.sort(key=lambda k: (self.entries[k].get('served', 0), self.entries[k].get('atime', 0)))
+            freed = 0
+            for key in keys:
+                if freed >= nbytes: break
+                if self.entries[key]['file'] not in self.pins: freed += self._remove(key)
+            self._flush(force=True)
+            return freed
+
+    def files(self):
+        with self.lock:
+            if self._index_changed(): self._load()
+            return {e['file'] for e in self.entries.values()}
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self._bytes(),
+                    'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'pinned': len(self.pins)}
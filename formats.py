@@ -0,0 +1,81 @@
+import os
+from transcode import PRESETS, can_copy
+
+# Per-request limits on what gets downloaded; $FORMAT_MAX_HEIGHT / $FORMAT_MAX_BYTES set the defaults
+DEFAULT_POLICY = { 'max_height': int(os.environ.get('FORMAT_MAX_HEIGHT', 0)) or None,
+                   'max_bytes': int(os.environ.get('FORMAT_MAX_BYTES', 0)) or None,
+                   'prefer_no_transcode': True }
+# Protocols served by a single ranged GET; these can also be streamed through /api/download?stream=1
+DIRECT = ('http', 'https')
+# Fields /api/formats reports per format
+SUMMARY_FIELDS = ('format_id', 'ext', 'protocol', 'vcodec', 'acodec', 'height', 'fps', 'abr', 'tbr')
+
+def estimate_bytes(f, duration=None):
+    # yt-dlp fills filesize_approx from tbr x duration before selecting; raw format lists may still need it
+    size = f.get('filesize') or f.get('filesize_approx')
+    if size: return int(size)
+    if f.get('tbr') and duration: return int(f['tbr'] * duration * 125)
+    return None
+
+def parse_policy(params):
+    """Policy from request parameters (max_height, max_bytes, transcode=1); raises ValueError on bad numbers."""
+    policy = dict(DEFAULT_POLICY)
+    for name in ('max_height', 'max_bytes'):
+        if params.get(name): policy[name] = max(int(params[name]), 1)
+    if str(params.get('transcode')).lower() in ('1', 'true'): policy['prefer_no_transcode'] = False
+    return policy
+
+def policy_tag(policy):
+    # Names the policy inside cache keys and file names; the default policy keeps the old name 'best'
+    parts = [f"h{policy['max_height']}" if policy.get('max_height') else '',
+             f"b{policy['max_bytes']}" if policy.get('max_bytes') else '',
+             '' if policy.get('prefer_no_transcode', True) else 'any']
+    return '-'.join(p for p in parts if p) or 'best'
+
+def target_abr(preset):
+    args = PRESETS[preset]['args']
+    return int(args[args.index('-b:a') + 1].rstrip('k')) if '-b:a' in args else 0
+
+def is_audio(f): return f.get('vcodec') == 'none' and f.get('acodec') != 'none'
+def is_progressive(f): return f.get('vcodec') != 'none' and f.get('acodec') != 'none'
+
+def rank(formats, policy, preset=None, duration=None):
+    """Formats best first, as the mp4 download (``preset`` None) or as the source for an audio preset.
+
+    Audio takes audio-only streams: one the preset can remux without
+    re-encoding when ``prefer_no_transcode`` is set, then the smallest at
+    or above the preset's bitrate (or the highest below it). Only without
+    audio-only streams does it fall back to the smallest progressive one.
+    Video takes progressive streams up to ``max_height``: mp4 first when
+    ``prefer_no_transcode`` is set, then the highest resolution, then
+    direct over segmented protocols and the fewest bytes. Formats over
+    ``max_height`` or ``max_bytes`` are only kept as a fallback at the
+    end, smallest first.
+    """
+    size = lambda f: estimate_bytes(f, duration) or float('inf')
+    if preset:
+        pool = [f for f in formats if is_audio(f)]
+        target = target_abr(preset)
+        def key(f):
+            abr = f.get('abr') or f.get('tbr') or 0
+            return (policy['prefer_no_transcode'] and not can_copy(preset, f.get('acodec')),
+                    abr < target, -abr if abr < target else size(f), f.get('protocol') not in DIRECT)
+        if not pool: pool, key = [f for f in formats if is_progressive(f)], size
+    else:
+        pool = [f for f in formats if is_progressive(f)]
+        key = lambda f: (policy['prefer_no_transcode'] and f.get('ext') != 'mp4', -(f.get('height') or 0),
+                         f.get('protocol') not in DIRECT, size(f))
+    def fits(f):
+        if not preset and policy.get('max_height') and (f.get('height') or 0) > policy['max_height']: return False
+        return not policy.get('max_bytes') or (estimate_bytes(f, duration) or 0) <= policy['max_bytes']
+    return sorted(filter(fits, pool), key=key) + sorted((f for f in pool if not fits(f)), key=size)
+
+def selector(policy, preset=None):
+    """A yt-dlp ``format`` callable that picks ``rank``'s first choice (or yt-dlp's last-resort best)."""
+    def select(ctx):
+        yield from rank(ctx['formats'], policy, preset)[:1] or ctx['formats'][-1:]
+    return select
+
+def summarize(f, duration=None):
+    # Without the signed URL, so it can be cached for as long as the format list itself holds
+    return { **{ k: f.get(k) for k in SUMMARY_FIELDS }, 'filesize_approx': estimate_bytes(f, duration) }
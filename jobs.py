@@ -0,0 +1,89 @@
+import threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = 'queued'
+        self.progress = {}
+        self.result = self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def progress_hook(self, d):
+        # yt-dlp progress_hooks: status is downloading/finished/error
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        done = d.get('downloaded_bytes') or 0
+        self.progress = {'stage': 'download', 'status': d.get('status'), 'downloaded_bytes': done,
+                         'total_bytes': total, 'speed': d.get('speed'), 'eta': d.get('eta'),
+                         'percent': round(done * 100 / total, 1) if total else None}
+
+    def postprocessor_hook(self, d):
+        self.progress = {**self.progress, 'stage': 'postprocess', 'status': d.get('status'),
+                         'postprocessor': d.get('postprocessor')}
+
+    def to_dict(self):
+        return {'id': self.id, 'status': self.status, 'progress': self.progress, 'error': self.error,
+                'created': self.created, 'finished': self.finished, **self.params}
+
+
+class JobQueue:
+    """Bounded worker pool for background jobs with admission control.
+
+    At most ``workers`` jobs run at once and at most ``max_queued`` wait;
+    ``submit`` raises ``QueueFull`` beyond that so callers can shed load.
+    Finished jobs are kept for ``keep_seconds`` so clients can poll them.
+    """
+
+    def __init__(self, workers=4, max_queued=32, keep_seconds=3600):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.keep_seconds = keep_seconds
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='job')
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.rejected = 0
+
+    def _active(self): return sum(1 for j in self.jobs.values() if j.status in ('queued', 'running'))
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [k for k, j in self.jobs.items() if j.finished and j.finished < cutoff]:
+            del self.jobs[job_id]
+
+    def submit(self, fn, **params):
+        with self.lock:
+            self._prune()
+            if self._active() >= self.workers + self.max_queued:
+                self.rejected += 1
+                raise QueueFull()
+            job = Job(params)
+            self.jobs[job.id] = job
+        self.executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        job.status = 'running'
+        try:
+            job.result = fn(job)
+            job.progress = {**job.progress, 'stage': 'done', 'percent': 100.0}
+            job.status = 'done'
+        except Exception as e:
+            job.error, job.status = str(e), 'error'
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        with self.lock: return self.jobs.get(job_id)
+
+    def stats(self):
+        with self.lock:
+            by_status = {}
+            for j in self.jobs.values(): by_status[j.status] = by_status.get(j.status, 0) + 1
+            return {'workers': self.workers, 'max_queued': self.max_queued, 'rejected': self.rejected, **by_status}
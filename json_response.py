@@ -0,0 +1,81 @@
+import gzip, hashlib, json, os, threading
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:  # stdlib json produces the same bytes, only slower
+    orjson = None
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Smaller bodies fit in a packet or two anyway, and would grow from the compression framing
+MIN_COMPRESS_BYTES = int(os.environ.get('JSON_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL, BROTLI_QUALITY = 6, 5
+# Clients keep their copy but revalidate it every time, which a matching ETag answers with an empty 304
+HEADERS = { 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding' }
+
+def dumps(data):
+    # Sorted keys and no whitespace (like jsonify), so equal results give equal bytes and equal ETags
+    if orjson: return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode()
+
+def etag(body):
+    # Weak: the gzip and brotli encodings of a body are the same representation as far as revalidation goes
+    return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+def etag_matches(header, tag):
+    if not header: return False
+    if header.strip() == '*': return True
+    return tag[2:] in (t.strip().removeprefix('W/') for t in header.split(','))
+
+def accepted_encoding(header):
+    """'br' or 'gzip' if the Accept-Encoding header allows it (brotli only with the package installed), else None."""
+    offered = {}
+    for part in (header or '').split(','):
+        name, _, params = part.partition(';')
+        try: q = float(params.strip()[2:]) if params.strip().startswith('q=') else 1.0
+        except ValueError: q = 0.0
+        if name.strip(): offered[name.strip().lower()] = q
+    for encoding in (('br',) if brotli else ()) + ('gzip',):
+        if offered.get(encoding, offered.get('*', 0)) > 0: return encoding
+    return None
+
+
+class _Compressed:
+    # Re-polled results are the same bytes over and over, so each (ETag, encoding) is compressed once
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, tag, encoding, body):
+        key = (tag, encoding)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        data = brotli.compress(body, quality=BROTLI_QUALITY) if encoding == 'br' else gzip.compress(body, GZIP_LEVEL, mtime=0)
+        with self.lock:
+            self.entries[key] = data
+            while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+        return data
+
+compressed = _Compressed()
+
+def conditional(body, if_none_match=None, accept_encoding=None):
+    """(status, body, headers) for a serialized JSON ``body``.
+
+    304 with no body when ``if_none_match`` names its ETag; otherwise the
+    body, gzip- or brotli-compressed when it is at least
+    MIN_COMPRESS_BYTES and the client accepts it.
+    """
+    tag = etag(body)
+    headers = { **HEADERS, 'ETag': tag }
+    if etag_matches(if_none_match, tag): return 304, b'', headers
+    encoding = accepted_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        body = compressed.get(tag, encoding, body)
+        headers['Content-Encoding'] = encoding
+    return 200, body, headers
@@ -0,0 +1,112 @@
+import json, logging, sqlite3, threading, time
+from collections import OrderedDict
+from singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+def normalize_query(q): return ' '.join(q.lower().split())
+
+
+class MetaCache:
+    """TTL + LRU cache for search metadata (normalized query -> result list).
+
+    Fresh entries are returned directly. Entries past ``ttl`` but within
+    ``stale_ttl`` are returned immediately while a background thread reloads
+    them (stale-while-revalidate). Misses for the same key are coalesced.
+    With ``disk_path`` set, entries are also written to SQLite so they
+    survive restarts.
+    """
+
+    def __init__(self, max_entries=2000, disk_path=None, disk_max_age=7 * 86400):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # key -> (stored_at, value)
+        self.refreshing = set()
+        self.flights = SingleFlight()
+        self.hits = self.stale_hits = self.misses = 0
+        self.namespaces = {}
+        self.db = None
+        self.disk_max_age = disk_max_age
+        if disk_path:
+            self.db = sqlite3.connect(disk_path, check_same_thread=False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, stored REAL, value TEXT)')
+            self.db.execute('DELETE FROM meta WHERE stored < ?', (time.time() - disk_max_age,))
+            self.db.commit()
+
+    def _lookup(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                return entry
+            if self.db is None: return None
+            row = self.db.execute('SELECT stored, value FROM meta WHERE key = ?', (key,)).fetchone()
+        if row is None: return None
+        entry = (row[0], json.loads(row[1]))
+        self._store(key, entry, disk=False)
+        return entry
+
+    def _store(self, key, entry, disk=True):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+            if disk and self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?, ?)', (key, entry[0], json.dumps(entry[1])))
+                self.db.commit()
+
+    def _load(self, key, loader):
+        value = loader()
+        self._store(key, (time.time(), value))
+        return value
+
+    def _refresh(self, key, loader):
+        try: self.flights.do(key, lambda: self._load(key, loader))
+        except Exception as e: log.warning('Refresh %s gagal: %s', key, e)
+        finally:
+            with self.lock: self.refreshing.discard(key)
+
+    def _count(self, namespace, result):
+        # Caller holds self.lock
+        counts = self.namespaces.setdefault(namespace, {'hit': 0, 'stale': 0, 'miss': 0})
+        counts[result] += 1
+
+    def get(self, namespace, query, loader, ttl, stale_ttl=0, normalize=normalize_query):
+        key = f'{namespace}:{normalize(query)}'
+        entry = self._lookup(key)
+        age = time.time() - entry[0] if entry else None
+        if entry and age < ttl:
+            with self.lock:
+                self.hits += 1
+                self._count(namespace, 'hit')
+            return entry[1]
+        if entry and age < ttl + stale_ttl:
+            with self.lock:
+                self.stale_hits += 1
+                self._count(namespace, 'stale')
+                start = key not in self.refreshing
+                self.refreshing.add(key)
+            if start: threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+            return entry[1]
+        with self.lock:
+            self.misses += 1
+            self._count(namespace, 'miss')
+        return self.flights.do(key, lambda: self._load(key, loader))
+
+    def peek(self, namespace, query, ttl, normalize=normalize_query):
+        # A fresh value without loading on a miss, for callers that produce the value themselves
+        entry = self._lookup(f'{namespace}:{normalize(query)}')
+        if entry is None or time.time() - entry[0] >= ttl: return None
+        with self.lock:
+            self.hits += 1
+            self._count(namespace, 'hit')
+        return entry[1]
+
+    def put(self, namespace, query, value, normalize=normalize_query):
+        self._store(f'{namespace}:{normalize(query)}', (time.time(), value))
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                    'stale_hits': self.stale_hits, 'misses': self.misses, 'coalesced': self.flights.coalesced,
+                    'disk': self.db is not None, 'namespaces': {k: dict(v) for k, v in self.namespaces.items()}}
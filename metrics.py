@@ -0,0 +1,113 @@
+import threading, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Route label for whatever is being timed; set per request, and explicitly by background workers
+current_route = ContextVar('current_route', default='background')
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _labels(names, values):
+    if not names: return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+        registry.metrics.append(self)
+
+    def _key(self, labels): return tuple(labels.get(n, '') for n in self.labelnames)
+
+    def samples(self):
+        with self.lock: return [(self.name, self.labelnames, k, v) for k, v in self.values.items()]
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock: self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def dec(self, amount=1, **labels): self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock: self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total, n = self.values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: counts[i] += 1
+            self.values[key] = (counts, total + value, n + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        out = []
+        with self.lock:
+            for key, (counts, total, n) in self.values.items():
+                for bound, c in zip(self.buckets, counts):
+                    out.append((f'{self.name}_bucket', self.labelnames + ('le',), key + (repr(float(bound)),), c))
+                out.append((f'{self.name}_bucket', self.labelnames + ('le',), key + ('+Inf',), n))
+                out.append((f'{self.name}_sum', self.labelnames, key, total))
+                out.append((f'{self.name}_count', self.labelnames, key, n))
+        return out
+
+
+class Registry:
+    """Minimal Prometheus registry: metrics updated in-process plus collectors read at scrape time."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []   # callables returning [(name, type, help, [(labels_dict, value), ...]), ...]
+
+    def counter(self, *a, **kw): return Counter(self, *a, **kw)
+    def gauge(self, *a, **kw): return Gauge(self, *a, **kw)
+    def histogram(self, *a, **kw): return Histogram(self, *a, **kw)
+
+    def collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for m in self.metrics:
+            lines += [f'# HELP {m.name} {m.help}', f'# TYPE {m.name} {m.type}']
+            lines += [f'{name}{_labels(names, key)} {value}' for name, names, key, value in m.samples()]
+        for fn in self.collectors:
+            for name, type_, help, samples in fn():
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {type_}']
+                lines += [f'{name}{_labels(tuple(l), tuple(l.values()))} {v}' for l, v in samples]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+stage_seconds = registry.histogram('ytdl_stage_seconds', 'Latency of each processing stage', ('route', 'stage'))
+
+@contextmanager
+def stage(name):
+    with stage_seconds.time(route=current_route.get(), stage=name): yield
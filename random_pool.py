@@ -0,0 +1,83 @@
+import logging, random, threading, time
+from singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+
+class RandomPool:
+    """Pre-fetched pool of entries for the random suggestions feed.
+
+    ``fetch(seed)`` returns shaped entries for one seed query. A background
+    thread refreshes one seed per ``interval`` seconds in rotation, so the
+    pool is replaced a slice at a time and no request waits on upstream
+    once it has been filled. ``sample(k)`` draws from a snapshot tuple in
+    O(k). Only the very first request (empty pool) fetches synchronously.
+    """
+
+    def __init__(self, fetch, seeds, max_entries=500, interval=120.0):
+        self.fetch = fetch
+        self.seeds = list(seeds)
+        self.max_entries = max_entries
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.by_seed = {}          # seed -> list of entries, in rotation order
+        self.entries = ()          # flattened, de-duplicated snapshot used by sample()
+        self.next_seed = 0
+        self.refreshes = self.failures = 0
+        self.refreshed_at = None
+        self.flights = SingleFlight()
+        self._thread = None
+
+    def _rebuild(self):
+        # Caller holds the lock; newest seeds win duplicate ids
+        seen, out = set(), []
+        for seed in reversed(self.seeds):
+            for e in self.by_seed.get(seed, ()):
+                if e['id'] not in seen:
+                    seen.add(e['id'])
+                    out.append(e)
+        self.entries = tuple(out[:self.max_entries])
+
+    def refresh_one(self):
+        with self.lock:
+            seed = self.seeds[self.next_seed % len(self.seeds)]
+            self.next_seed += 1
+        try:
+            results = [e for e in self.fetch(seed) if e and e.get('id')]
+        except Exception as e:
+            with self.lock: self.failures += 1
+            log.warning('Refresh random pool (%s) gagal: %s', seed, e)
+            raise
+        with self.lock:
+            self.by_seed[seed] = results
+            self._rebuild()
+            self.refreshes += 1
+            self.refreshed_at = time.time()
+
+    def _run(self):
+        # Fill every seed once at startup, then refresh one seed per interval
+        for _ in self.seeds:
+            try: self.refresh_one()
+            except Exception: pass
+        while True:
+            time.sleep(self.interval)
+            try: self.refresh_one()
+            except Exception: pass
+
+    def start(self):
+        with self.lock:
+            if self._thread: return
+            self._thread = threading.Thread(target=self._run, name='random-pool', daemon=True)
+        self._thread.start()
+
+    def sample(self, k):
+        self.start()
+        if not self.entries: self.flights.do('fill', self.refresh_one)
+        entries = self.entries
+        return random.sample(entries, min(k, len(entries)))
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'max_entries': self.max_entries, 'seeds': len(self.seeds),
+                    'filled_seeds': len(self.by_seed), 'interval': self.interval, 'refreshes': self.refreshes,
+                    'failures': self.failures, 'refreshed_at': self.refreshed_at}
@@ -0,0 +1,65 @@
+import copy, re, threading, time
+from collections import OrderedDict
+
+# Signed media URLs carry their expiry as ?expire=<unix time> (or /expire/<t>/ in manifest paths)
+EXPIRE_RE = re.compile(r'[?&/]expire[=/](\d+)')
+# Only needed to choose a format, or large and unused once one has been chosen
+DROP_FIELDS = ('formats', 'thumbnails', 'subtitles', 'automatic_captions', 'requested_subtitles', 'heatmap',
+               'chapters', 'description', 'tags', 'categories', '_format_sort_fields')
+
+def url_expiry(url):
+    m = EXPIRE_RE.search(url or '')
+    return int(m.group(1)) if m else None
+
+
+class ResolvedCache:
+    """Resolved format info per (video id, option profile), kept until the signed URL expires.
+
+    ``put`` stores extract_info's result trimmed to the chosen format
+    (direct URL, headers, size, codecs), so ``process_ie_result`` can go
+    straight to fetching without the player/signature extraction. Entries
+    expire ``margin`` seconds before the URL's own ``expire`` parameter,
+    leaving time for the download to run. Results without a single
+    direct URL (merged formats) or without an expiry are not cached.
+    """
+
+    def __init__(self, max_entries=5000, margin=300, max_ttl=6 * 3600):
+        self.max_entries, self.margin, self.max_ttl = max_entries, margin, max_ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # (id, profile) -> (expires, info)
+        self.hits = self.misses = self.expired = self.uncacheable = 0
+
+    def get(self, video_id, profile):
+        with self.lock:
+            item = self.entries.get((video_id, profile))
+            if item and item[0] > time.time():
+                self.entries.move_to_end((video_id, profile))
+                self.hits += 1
+                return copy.deepcopy(item[1])
+            if item:
+                del self.entries[(video_id, profile)]
+                self.expired += 1
+            self.misses += 1
+        return None
+
+    def put(self, profile, info):
+        expires = url_expiry(info.get('url'))
+        if not info.get('id') or not expires or info.get('requested_formats'):
+            with self.lock: self.uncacheable += 1
+            return False
+        expires = min(expires - self.margin, time.time() + self.max_ttl)
+        if expires <= time.time(): return False
+        trimmed = copy.deepcopy({ k: v for k, v in info.items() if k not in DROP_FIELDS })
+        with self.lock:
+            self.entries[(info['id'], profile)] = (expires, trimmed)
+            self.entries.move_to_end((info['id'], profile))
+            while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+        return True
+
+    def discard(self, video_id, profile):
+        with self.lock: self.entries.pop((video_id, profile), None)
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                    'misses': self.misses, 'expired': self.expired, 'uncacheable': self.uncacheable}
@@ -0,0 +1,103 @@
+import itertools, threading, time
+from collections import OrderedDict
+
+
+class _Buffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries, self.ids = [], set()
+        self.source = self.close = None
+        self.exhausted = False
+        self.used = time.monotonic()
+
+
+class SearchBuffers:
+    """Per-query search results that grow as deeper pages are asked for.
+
+    ``open(query)`` returns ``(entries, close)``: a lazy iterator over the
+    query's results (yt-dlp's search generator, which fetches the next
+    continuation page only when it runs dry) and a callable releasing what
+    backs it. ``page(key, query, offset, limit)`` pulls just enough from that
+    iterator to cover the page, so page N+1 continues where page N stopped
+    and costs at most one upstream fetch. Each pull runs through ``call``
+    (e.g. the upstream limiter). ``on_entry(index, entry)`` sees the
+    page's entries as they arrive: buffered ones first, then each new one
+    as soon as the generator yields it. Buffers idle for ``idle`` seconds are
+    closed, as are the least recently used beyond ``max_buffers``; a
+    buffer stops growing at ``max_results`` entries.
+    """
+
+    def __init__(self, open, shape, call=None, idle=600.0, max_buffers=200, max_results=500):
+        self.open, self.shape, self.call = open, shape, call or (lambda fn: fn())
+        self.idle, self.max_buffers, self.max_results = idle, max_buffers, max_results
+        self.lock = threading.Lock()
+        self.buffers = OrderedDict()   # normalized query -> _Buffer
+        self.opened = self.evicted = self.pulls = 0
+
+    def _sweep(self):
+        # Caller holds self.lock; returns the buffers to close once it is released
+        now, out = time.monotonic(), []
+        for key, buf in list(self.buffers.items()):
+            if now - buf.used < self.idle and len(self.buffers) <= self.max_buffers: break
+            out.append(self.buffers.pop(key))
+        self.evicted += len(out)
+        return out
+
+    @staticmethod
+    def _release(buf):
+        # Caller holds buf.lock
+        if buf.close: buf.close()
+        buf.source = buf.close = None
+
+    def page(self, key, query, offset, limit, on_entry=None):
+        """Returns ``(entries, more)`` for results ``offset`` to ``offset + limit`` of ``query`` (buffered as ``key``)."""
+        with self.lock:
+            buf = self.buffers.get(key)
+            if buf is None: buf = self.buffers[key] = _Buffer()
+            buf.used = time.monotonic()
+            self.buffers.move_to_end(key)
+            stale = self._sweep()
+        for old in stale:
+            with old.lock: self._release(old)
+        want = min(offset + limit, self.max_results)
+        with buf.lock:
+            if on_entry:
+                for i in range(offset, min(want, len(buf.entries))): on_entry(i, buf.entries[i])
+            def add(raw):
+                for e in self.shape([raw]):
+                    # Continuation pages sometimes repeat a result from an earlier page
+                    if not e['id'] or e['id'] in buf.ids: continue
+                    buf.ids.add(e['id'])
+                    buf.entries.append(e)
+                    if on_entry and offset < len(buf.entries) <= want: on_entry(len(buf.entries) - 1, e)
+            def pull():
+                # A generator that raised is finished, so a retry (or the next page) opens a fresh one;
+                # it starts over, and results already buffered are skipped below
+                if buf.source is None:
+                    buf.source, buf.close = self.open(query)
+                    with self.lock: self.opened += 1
+                # Returns whether the results ran out before the slice was filled
+                n, need = 0, want - len(buf.entries)
+                try:
+                    for raw in itertools.islice(buf.source, need):
+                        n += 1
+                        add(raw)
+                    return n < need
+                except Exception:
+                    self._release(buf)
+                    raise
+            while len(buf.entries) < want and not buf.exhausted:
+                # One pull per page: the generator fetches at most the continuation pages this slice needs
+                buf.exhausted = self.call(pull)
+                with self.lock: self.pulls += 1
+            if len(buf.entries) >= self.max_results: buf.exhausted = True
+            entries = buf.entries[offset:offset + limit]
+            more = not buf.exhausted or len(buf.entries) > offset + limit
+            if buf.exhausted: self._release(buf)
+        return entries, more
+
+    def stats(self):
+        with self.lock:
+            return {'buffers': len(self.buffers), 'max_buffers': self.max_buffers, 'idle': self.idle,
+                    'entries': sum(len(b.entries) for b in self.buffers.values()), 'opened': self.opened,
+                    'evicted': self.evicted, 'pulls': self.pulls}
@@ -1,345 +1,748 @@
-from flask import Flask, jsonify, request, send_file, render_template_string
-from yt_dlp import YoutubeDL
-import os, logging, random
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, request, send_file, render_template
+from ydl_pool import YdlPool, flat_search_opts
+from download_cache import DownloadCache, video_id_from_url
+from singleflight import SingleFlight
+from metacache import MetaCache, normalize_query
+from suggest_index import SuggestIndex
+from random_pool import RandomPool
+from search_buffer import SearchBuffers
+from storage import StorageManager
+from artifact_store import open_store
+from resolved import ResolvedCache
+from upstream import UpstreamLimiter, UpstreamBusy, UpstreamThrottled, INTERACTIVE, NORMAL, BULK
+from thumbs import ThumbCache, ThumbNotFound, SIZES as THUMB_SIZES, thumb_url
+from formats import parse_policy, policy_tag, rank, selector, summarize
+from jobs import JobQueue, QueueFull
+from transcode import Transcoder, PRESETS, DEFAULT_PRESET, preset_for
+from metrics import registry, stage, stage_seconds, current_route
+import json_response
+from contextvars import copy_context
+from streaming import iter_http, iter_zip, primed, tee_to_file
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from queue import Queue
+from urllib.parse import quote
+from werkzeug.wsgi import ClosingIterator
+import os, atexit, hashlib, json, logging, threading, time, unicodedata, uuid
 
-app = Flask(__name__)
-app.logger.setLevel(logging.DEBUG)
+# The logger Flask hands out as app.logger (named after this file even when run as __main__);
+# services below also log from worker threads where no app is current
+log = logging.getLogger('server')
+bp = Blueprint('app', __name__)
 
 DOWNLOAD_FOLDER = 'downloads'
 os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
+download_cache = DownloadCache(DOWNLOAD_FOLDER, int(os.environ.get('DOWNLOAD_CACHE_MAX_BYTES', 2 * 1024**3)))
+download_flights = SingleFlight(lock_dir=os.path.join(DOWNLOAD_FOLDER, '.locks'))
+# Optional store shared by replicas (file:///shared/dir or s3://bucket/prefix); unset means single node
+artifact_store = open_store(os.environ.get('ARTIFACT_STORE'), lock_timeout=float(os.environ.get('ARTIFACT_STORE_LOCK_TIMEOUT', 600)))
+# Folder-wide quota: orphans are cleaned and cache entries evicted from the high down to the low watermark
+storage = StorageManager(DOWNLOAD_FOLDER, download_cache, int(os.environ.get('DOWNLOAD_QUOTA_BYTES', download_cache.max_bytes)),
+                         float(os.environ.get('DOWNLOAD_QUOTA_HIGH', 0.9)), float(os.environ.get('DOWNLOAD_QUOTA_LOW', 0.75)),
+                         os.environ.get('DOWNLOAD_EVICTION_POLICY', 'lru'), float(os.environ.get('STORAGE_SWEEP_INTERVAL', 60)),
+                         float(os.environ.get('STORAGE_ORPHAN_AGE', 3600)), download_flights).start()
+# Search metadata: (ttl, stale-while-revalidate window) in seconds per endpoint
+META_TTL = { 'search': (600, 3600), 'suggest': (1800, 3600), 'formats': (6 * 3600, 86400) }
+# Every extraction shares one upstream budget; routes not listed here (downloads, jobs, background refreshes) are bulk
+upstream = UpstreamLimiter(float(os.environ.get('UPSTREAM_RATE', 5)), int(os.environ.get('UPSTREAM_BURST', 10)),
+                           max_limit=int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 32)))
+ROUTE_PRIORITY = { '/api/suggest': INTERACTIVE, '/api/search': NORMAL, '/api/search/batch': NORMAL,
+                   '/api/random_suggestions': NORMAL }
+ydl_pool = YdlPool({
+    **{ f'flat-search-{n}': flat_search_opts(n) for n in (5, 10, 12, 50, 'all') },
+    'flat-playlist': { 'quiet': True, 'extract_flat': 'in_playlist' },
+    # Audio is fetched as-is and encoded by the transcoder, so one source serves every preset that picks it.
+    # Each request swaps in a formats.selector for its policy; 'format' here is only the fallback.
+    # Output names are stable per video and stream, so an interrupted fetch resumes from its .part file.
+    'download-audio': { 'format': 'bestaudio/best', 'outtmpl': f'{DOWNLOAD_FOLDER}/%(id)s-audio-%(format_id)s.%(ext)s',
+                        'quiet': True, 'continuedl': True, 'retries': 10 },
+    'download-mp4': { 'format': 'best', 'outtmpl': f'{DOWNLOAD_FOLDER}/%(id)s-mp4-%(format_id)s.%(ext)s', 'quiet': True,
+                      'continuedl': True, 'retries': 10 },
+}, limiter=upstream, priority=lambda: ROUTE_PRIORITY.get(current_route.get(), BULK))
+resolved_cache = ResolvedCache(int(os.environ.get('RESOLVED_CACHE_MAX_ENTRIES', 5000)))
+transcoder = Transcoder(int(os.environ.get('TRANSCODE_WORKERS', 0)) or None)
+PLAYLIST_MAX_ITEMS = int(os.environ.get('PLAYLIST_MAX_ITEMS', 200))
+PLAYLIST_MAX_CONCURRENCY = 8
+job_queue = JobQueue(int(os.environ.get('JOB_WORKERS', 4)), int(os.environ.get('JOB_MAX_QUEUED', 32)))
+meta_cache = MetaCache(int(os.environ.get('META_CACHE_MAX_ENTRIES', 2000)), os.environ.get('META_CACHE_DB'))
+http_requests = registry.counter('http_requests_total', 'HTTP requests by route and status', ('route', 'method', 'status'))
+http_latency = registry.histogram('http_request_duration_seconds', 'Time until the response object is ready', ('route',))
+errors_total = registry.counter('ytdl_errors_total', 'Handled errors by exception type', ('route', 'exception'))
+bytes_served = registry.counter('http_response_bytes_total', 'Response body bytes sent', ('route',))
 
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="id">
-<head>
-  <meta charset="UTF-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1.0"/>
-  <title>YouTube MP3/MP4 Downloader</title>
-  <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-  <style>
-    body { font-family: 'Segoe UI', sans-serif; background: #f0f2f5; margin: 0; padding: 20px; }
-    .container { max-width: 900px; margin: auto; background: #fff; padding: 30px; border-radius: 12px;
-                 box-shadow: 0 4px 10px rgba(0,0,0,0.1); }
-    h1 { text-align: center; margin-bottom: 20px; color: #333; }
-    input[type="text"] { width: 100%; box-sizing: border-box; padding: 15px; font-size: 16px;
-                           border: 1px solid #ccc; border-radius: 8px; margin-bottom: 10px; }
-    button { padding: 12px 20px; font-size: 14px; margin: 10px 5px 15px 0; border: none; border-radius: 8px;
-             background-color: #007bff; color: white; cursor: pointer; }
-    button:hover { background-color: #0056b3; }
-    .search-status { font-style: italic; color: #555; font-size: 16px;
-                     animation: pulse 1.2s infinite; margin-top: 10px; }
-    @keyframes pulse { 0% { opacity: 0.2; } 50% { opacity: 1; } 100% { opacity: 0.2; } }
-    .suggestions { border: 1px solid #ccc; padding: 15px; border-radius: 8px;
-                   background: #fff; box-shadow: 0 4px 6px rgba(0,0,0,0.1); margin-top: 25px;
-                   max-height: 300px; overflow-y: auto; }
-    .suggestions div { padding: 8px; cursor: pointer; }
-    .suggestions div:hover { background: #f1f1f1; }
-
-    .video-suggestions, .search-results { margin-top: 30px; }
-    .video-grid {
-      display: grid;
-      grid-template-columns: repeat(auto-fill, minmax(250px, 1fr));
-      gap: 15px;
-      margin-top: 15px;
-    }
-    .suggestion-card {
-      border: 1px solid #eee;
-      border-radius: 8px;
-      overflow: hidden;
-      transition: transform 0.2s;
-    }
-    .suggestion-card:hover {
-      transform: translateY(-5px);
-      box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-    }
-    .suggestion-thumbnail {
-      width: 100%;
-      height: 140px;
-      object-fit: cover;
-    }
-    .suggestion-details {
-      padding: 12px;
-    }
-    .suggestion-title {
-      font-size: 14px;
-      font-weight: 500;
-      margin-bottom: 5px;
-      display: -webkit-box;
-      -webkit-line-clamp: 2;
-      -webkit-box-orient: vertical;
-      overflow: hidden;
-    }
-    .suggestion-author {
-      font-size: 12px;
-      color: #666;
-      margin-bottom: 8px;
-    }
-    .suggestion-buttons {
-      display: flex;
-      gap: 8px;
-    }
-    .suggestion-buttons button {
-      flex: 1;
-      padding: 5px;
-      font-size: 12px;
-    }
-    .contact-section {
-      margin-top: 40px;
-      padding: 25px;
-      background: #f8f9fa;
-      border-radius: 10px;
-    }
-    .contact-title {
-      font-size: 18px;
-      margin-bottom: 15px;
-      color: #333;
-      font-weight: 600;
-      text-align: center;
-    }
-    .contact-grid {
-      display: grid;
-      grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-      gap: 15px;
-    }
-    .contact-card {
-      padding: 15px;
-      background: white;
-      border-radius: 8px;
-      box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-    }
-    .contact-icon {
-      font-size: 24px;
-      margin-bottom: 10px;
-      color: #007bff;
-      text-align: center;
-    }
-    .contact-label, .contact-value {
-      text-align: center;
-    }
-    .contact-label {
-      font-size: 14px;
-      color: #666;
-      margin-bottom: 5px;
-    }
-    .contact-value {
-      font-size: 16px;
-      font-weight: 500;
-      color: #333;
-    }
-    .contact-link {
-      color: inherit;
-      text-decoration: none;
-    }
-  </style>
-</head>
-<body>
-  <div class="container">
-    <h1>YouTube Downloader</h1>
-    <input type="text" id="query" placeholder="Masukkan judul atau link YouTube..." oninput="suggest()" />
-    <button onclick="search()">Cari</button>
-
-    <div id="suggestions" class="suggestions" style="display:none;"></div>
-    <div class="search-results" id="results"></div>
-
-    <div class="video-suggestions">
-      <div class="video-grid" id="random-video-container"></div>
-    </div>
-
-    <div class="contact-section">
-      <div class="contact-title">Kontak Kami</div>
-      <div class="contact-grid">
-        <div class="contact-card">
-          <div class="contact-icon"><i class="fab fa-whatsapp"></i></div>
-          <div class="contact-label">WhatsApp</div>
-          <div class="contact-value">
-            <a href="https://wa.me/6283139749414" class="contact-link" target="_blank">+62-831-3974-9414</a>
-          </div>
-        </div>
-        <div class="contact-card">
-          <div class="contact-icon"><i class="fas fa-envelope"></i></div>
-          <div class="contact-label">Email</div>
-          <div class="contact-value">
-            <a href="mailto:support@example.com" class="contact-link">suppytdownloder@gmail.com</a>
-          </div>
-        </div>
-        <div class="contact-card">
-          <div class="contact-icon"><i class="fab fa-instagram"></i></div>
-          <div class="contact-label">Instagram</div>
-          <div class="contact-value">
-            <a href="https://instagram.com/example" class="contact-link" target="_blank">@kalll_kall</a>
-          </div>
-        </div>
-      </div>
-    </div>
-  </div>
-
-<script>
-  let suggestTimeout;
-  function suggest() {
-    clearTimeout(suggestTimeout);
-    const q = document.getElementById('query').value;
-    const sugDiv = document.getElementById('suggestions');
-    if (q.length < 3) { sugDiv.style.display = 'none'; return; }
-    suggestTimeout = setTimeout(async () => {
-      try {
-        const res = await fetch(`/api/suggest?q=${encodeURIComponent(q)}`);
-        const data = await res.json();
-        if (res.ok) {
-          sugDiv.innerHTML = data.map(item => `<div onclick="pickSuggest('${item.replace(/'/g, "\\'")}')">${item}</div>`).join('');
-          sugDiv.style.display = 'block';
-        }
-      } catch (e) { console.error(e); }
-    }, 300);
-  }
-
-  function pickSuggest(val) {
-    document.getElementById('query').value = val;
-    document.getElementById('suggestions').style.display = 'none';
-    search();
-  }
-
-  async function search() {
-    document.getElementById('suggestions').style.display = 'none';
-    const q = document.getElementById('query').value;
-    const resDiv = document.getElementById('results');
-    resDiv.innerHTML = '<p class="search-status">Mencari...</p>';
-    try {
-      const res = await fetch(`/api/search?q=${encodeURIComponent(q)}`);
-      const data = await res.json();
-      if (!res.ok) return resDiv.innerHTML = `<p>Error: ${data.error}</p>`;
-      resDiv.innerHTML = '<div class="video-grid" id="search-results-grid"></div>';
-      const grid = document.getElementById('search-results-grid');
-      data.forEach(video => {
-        const card = document.createElement('div');
-        card.className = 'suggestion-card';
-        card.innerHTML = `
-          <img class="suggestion-thumbnail" src="${video.thumbnail}" />
-          <div class="suggestion-details">
-            <div class="suggestion-title">${video.title}</div>
-            <div class="suggestion-author">${video.author}</div>
-            <div class="suggestion-buttons">
-              <button onclick="download('${video.url}','mp3')">MP3</button>
-              <button onclick="download('${video.url}','mp4')">MP4</button>
-            </div>
-          </div>`;
-        grid.appendChild(card);
-      });
-    } catch (e) { resDiv.innerHTML = `<p>Error: ${e.message}</p>`; }
-  }
-
-  function download(url, fmt) {
-    const a = document.createElement('a');
-    a.href = `/api/download?url=${encodeURIComponent(url)}&format=${fmt}`;
-    a.click();
-  }
-
-  async function loadRandomSuggestions() {
-    const container = document.getElementById('random-video-container');
-    try {
-      const res = await fetch('/api/random_suggestions');
-      const data = await res.json();
-      if (!res.ok) return;
-      container.innerHTML = '';
-      data.forEach(video => {
-        const card = document.createElement('div');
-        card.className = 'suggestion-card';
-        card.innerHTML = `
-          <img class="suggestion-thumbnail" src="${video.thumbnail}" />
-          <div class="suggestion-details">
-            <div class="suggestion-title">${video.title}</div>
-            <div class="suggestion-author">${video.author}</div>
-            <div class="suggestion-buttons">
-              <button onclick="download('${video.url}','mp3')">MP3</button>
-              <button onclick="download('${video.url}','mp4')">MP4</button>
-            </div>
-          </div>`;
-        container.appendChild(card);
-      });
-    } catch (e) {
-      console.error('Error loading suggestions:', e);
-    }
-  }
-
-  window.onload = loadRandomSuggestions;
-</script>
-</body>
-</html>
-'''
-
-@app.route('/')
-def index(): return render_template_string(HTML_TEMPLATE)
-
-@app.route('/api/suggest')
+@registry.collector
+def collect_state():
+    d, m, j, u, r = download_cache.stats(), meta_cache.stats(), job_queue.stats(), upstream.stats(), resolved_cache.stats()
+    return [
+        ('ytdl_cache_requests_total', 'counter', 'Cache lookups by cache, namespace and result',
+         [({ 'cache': 'download', 'namespace': 'artifact', 'result': r }, d[k]) for r, k in (('hit', 'hits'), ('miss', 'misses'))]
+         + [({ 'cache': 'meta', 'namespace': ns, 'result': r }, n) for ns, c in m['namespaces'].items() for r, n in c.items()]),
+        ('ytdl_cache_bytes', 'gauge', 'Bytes held in the download cache', [({}, d['bytes'])]),
+        ('ytdl_upstream_concurrency_limit', 'gauge', 'Adaptive limit on concurrent extractions', [({}, u['limit'])]),
+        ('ytdl_upstream_inflight', 'gauge', 'Extractions running now', [({}, u['inflight'])]),
+        ('ytdl_upstream_waiting', 'gauge', 'Extractions queued for the limiter', [({}, u['waiting'])]),
+        ('ytdl_upstream_calls_total', 'counter', 'Extraction attempts by outcome',
+         [({ 'outcome': k }, u[k]) for k in ('ok', 'throttled', 'transient')]),
+        ('ytdl_upstream_retries_total', 'counter', 'Extraction retries after transient errors', [({}, u['retries'])]),
+        ('ytdl_upstream_rejected_total', 'counter', 'Extractions that gave up waiting for the limiter', [({}, u['rejected'])]),
+        ('ytdl_resolved_cache_requests_total', 'counter', 'Resolved format info lookups by result',
+         [({ 'result': k }, r[k]) for k in ('hits', 'misses', 'expired')]),
+        ('ytdl_storage_bytes', 'gauge', 'Bytes in the download folder at the last sweep', [({}, storage.usage.get('bytes', 0))]),
+        ('ytdl_storage_quota_bytes', 'gauge', 'Download folder quota', [({}, storage.quota)]),
+        ('ytdl_downloads_in_flight', 'gauge', 'Artifacts currently being produced', [({}, download_flights.in_flight())]),
+        ('ytdl_downloads_coalesced_total', 'counter', 'Download requests that joined an in-flight fetch', [({}, download_flights.coalesced)]),
+        ('ytdl_jobs', 'gauge', 'Download jobs by status', [({ 'status': k }, v) for k, v in j.items() if k not in ('workers', 'max_queued', 'rejected')]),
+        ('ytdl_jobs_rejected_total', 'counter', 'Job submissions rejected by admission control', [({}, j['rejected'])]),
+        ('ytdl_random_pool_entries', 'gauge', 'Entries available to the random suggestions feed', [({}, len(random_pool.entries))]),
+    ]
+
+def route_label(): return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@bp.before_app_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    current_route.set(route_label())
+
+def count_bytes(body, route):
+    try:
+        for chunk in body:
+            bytes_served.inc(len(chunk), route=route)
+            yield chunk
+    finally:
+        if hasattr(body, 'close'): body.close()
+
+@bp.after_app_request
+def record_request_metrics(resp):
+    route = route_label()
+    http_latency.observe(time.perf_counter() - g.request_start, route=route)
+    http_requests.inc(route=route, method=request.method, status=resp.status_code)
+    if resp.content_length is not None: bytes_served.inc(resp.content_length, route=route)
+    elif resp.is_streamed: resp.response = count_bytes(resp.response, route)
+    return resp
+
+def api_json(data):
+    # The routes clients poll: content ETags answer If-None-Match with 304, larger bodies go out compressed
+    with stage('serialize'): body = json_response.dumps(data)
+    with stage('compress'):
+        status, body, headers = json_response.conditional(body, request.headers.get('If-None-Match'),
+                                                          request.headers.get('Accept-Encoding'))
+    return Response(body, status, headers, mimetype='application/json')
+
+def api_error(e):
+    errors_total.inc(route=current_route.get(), exception=type(e).__name__)
+    if isinstance(e, (UpstreamBusy, UpstreamThrottled)):
+        return jsonify({ 'error': str(e) }), 503, { 'Retry-After': str(upstream.retry_after()) }
+    return jsonify({ 'error': str(e) }), 500
+
+# /api/suggest answers from titles already seen by search/random and only asks upstream below this many local hits
+SUGGEST_MIN_LOCAL = 5
+suggest_index = SuggestIndex(os.environ.get('SUGGEST_INDEX_PATH', os.path.join(DOWNLOAD_FOLDER, '.suggest_index.tsv.gz')),
+                             int(os.environ.get('SUGGEST_INDEX_MAX_ENTRIES', 200_000)))
+atexit.register(suggest_index.save)
+# Thumbnails are proxied at the size the template draws them instead of yt-dlp's largest one
+THUMB_MAX_AGE = 30 * 86400
+thumb_cache = ThumbCache(os.path.join(DOWNLOAD_FOLDER, '.thumbs'), int(os.environ.get('THUMB_CACHE_MAX_BYTES', 200 * 1024**2)))
+BATCH_MAX_QUERIES = 50
+batch_pool = ThreadPoolExecutor(int(os.environ.get('BATCH_WORKERS', 8)), thread_name_prefix='batch')
+# The homepage feed samples from a pool refreshed one seed query at a time in the background
+RANDOM_SEEDS = os.environ.get('RANDOM_SEEDS', 'music,top hits,lagu indonesia,pop,rock,hip hop,jazz,lofi,acoustic,edm').split(',')
+# /api/search pages past the first extend one lazily fetched result set per query instead of searching again
+SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE = 10, 50
+# Streamed searches extract here, so a slow reader never holds up the upstream fetch
+search_stream_pool = ThreadPoolExecutor(int(os.environ.get('SEARCH_STREAM_WORKERS', 16)), thread_name_prefix='search-stream')
+search_buffers = SearchBuffers(lambda q: open_search(q), lambda entries: ingest(shape_entries(entries)),
+                               lambda fn: upstream.call(fn, ROUTE_PRIORITY.get(current_route.get(), BULK)),
+                               float(os.environ.get('SEARCH_BUFFER_IDLE', 600)), int(os.environ.get('SEARCH_BUFFER_MAX', 200)),
+                               int(os.environ.get('SEARCH_BUFFER_MAX_RESULTS', 500)))
+random_pool = RandomPool(lambda seed: ingest(shape_entries(flat_search(seed, 50))), [s.strip() for s in RANDOM_SEEDS if s.strip()],
+                         int(os.environ.get('RANDOM_POOL_MAX_ENTRIES', 500)), float(os.environ.get('RANDOM_POOL_INTERVAL', 120)))
+
+# UI variant -> (template, default thumbnail size); every variant talks to the same API
+UI_VARIANTS = { 'grid': ('grid.html', 'card'), 'compact': ('compact.html', 'compact'), 'list': ('list.html', 'list'),
+                'simple': ('index.html', 'small') }
+
+def index_page(app):
+    # The page has no per-request content, so it is rendered once per app and revalidated by ETag
+    page = app.extensions.get('index_page')
+    if page is None:
+        with app.app_context(): body = render_template(UI_VARIANTS[app.config['UI_VARIANT']][0]).encode()
+        page = app.extensions['index_page'] = (body, hashlib.sha1(body).hexdigest())
+    return page
+
+@bp.route('/')
+def index():
+    body, etag = index_page(current_app)
+    resp = Response(body, mimetype='text/html')
+    resp.set_etag(etag)
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+def shape_entries(entries):
+    return [
+        {'id': v.get('id'), 'title': v.get('title','Tanpa judul'),
+         'url': v.get('url'), 'thumbnail': thumb_url(v),
+         'author': v.get('uploader','Unknown')} for v in entries if v
+    ]
+
+def ingest(results):
+    suggest_index.ingest(results)
+    return results
+
+def flat_search(query, n):
+    with ydl_pool.checkout(f'flat-search-{n}') as ydl, stage('extract'):
+        info = ydl.extract_info(query, download=False)
+        return info.get('entries',[]) or []
+
+def open_search(query):
+    # The entries generator fetches continuation pages through this instance, so the buffer keeps it leased
+    # until it is exhausted or evicted; an instance whose generator raised is not returned to the pool
+    ydl, release = ydl_pool.lease('flat-search-all')
+    try: info = ydl.extract_info(f'ytsearchall:{query}', download=False, process=False)
+    except BaseException:
+        release(failed=True)
+        raise
+    failed = []
+    def entries():
+        try: yield from info.get('entries') or ()
+        except Exception:
+            failed.append(True)
+            raise
+    return entries(), lambda: release(bool(failed))
+
+def suggest_titles(q):
+    titles = suggest_index.query(q, 5)
+    if len(titles) < SUGGEST_MIN_LOCAL:
+        remote = meta_cache.get('suggest', q, lambda: ingest(shape_entries(flat_search(q, 5))), *META_TTL['suggest'])
+        titles += [r['title'] for r in remote if r['title'] not in titles]
+    return titles[:5]
+
+def random_results():
+    return random_pool.sample(12)
+
+@bp.route('/api/suggest')
 def suggest():
     q = request.args.get('q')
     if not q: return jsonify({ 'error': "Parameter 'q' diperlukan" }), 400
     try:
-        ydl_opts = { 'quiet': True, 'extract_flat': 'in_playlist', 'default_search': 'ytsearch5:' }
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(q, download=False)
-            titles = [e.get('title','') for e in info.get('entries',[]) if e]
-        return jsonify(titles)
+        return api_json(suggest_titles(q))
     except Exception as e:
-        return jsonify({ 'error': str(e) }), 500
+        return api_error(e)
 
-@app.route('/api/random_suggestions')
+@bp.route('/api/random_suggestions')
 def random_suggestions():
     try:
-        query = 'music'
-        ydl_opts = { 'quiet': True, 'extract_flat': 'in_playlist', 'default_search': 'ytsearch12:' }
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(query, download=False)
-            entries = info.get('entries',[]) or []
-            results = [
-                {'id': v.get('id'), 'title': v.get('title','Tanpa judul'),
-                 'url': v.get('url'), 'thumbnail': v.get('thumbnails',[{}])[-1].get('url'),
-                 'author': v.get('uploader','Unknown')} for v in entries if v
-            ]
-        random.shuffle(results)
-        return jsonify(results[:12])
+        return api_json(random_results())
     except Exception as e:
-        app.logger.error(f"Error random: {e}")
-        return jsonify({'error': str(e)}), 500
+        log.error(f"Error random: {e}")
+        return api_error(e)
+
+def search_results(q):
+    return meta_cache.get('search', q, lambda: ingest(shape_entries(flat_search(q, 10))), *META_TTL['search'])
+
+def search_page(q, cursor=0, limit=SEARCH_PAGE_SIZE):
+    # Results cursor..cursor+limit and the next page's cursor (None after the last page). The first page
+    # is the cached ytsearch10 result; the buffer's first upstream page covers it, so page 2 costs one fetch.
+    if cursor == 0 and limit <= SEARCH_PAGE_SIZE:
+        results = search_results(q)
+        results, more = results[:limit], len(results) >= SEARCH_PAGE_SIZE
+    else:
+        results, more = search_buffers.page(normalize_query(q), q, cursor, limit)
+    return results, cursor + len(results) if more and results else None
+
+def search_events(q, cursor=0, limit=SEARCH_PAGE_SIZE):
+    # ('entry', entry) as soon as each result is extracted, then ('next', cursor or None), or ('error', message)
+    # if extraction fails midway. Fills the same caches as search_page: a streamed first page is cached
+    # for the next plain request, and later pages extend the query's buffer.
+    first = cursor == 0 and limit == SEARCH_PAGE_SIZE
+    cached = meta_cache.peek('search', q, META_TTL['search'][0]) if first else None
+    if cached is not None:
+        for e in cached: yield 'entry', e
+        yield 'next', len(cached) if len(cached) >= SEARCH_PAGE_SIZE else None
+        return
+    events, gone = Queue(), threading.Event()
+    def run():
+        # Nothing to fetch for a client that left while this waited for a worker
+        if gone.is_set(): return
+        try:
+            results, more = search_buffers.page(normalize_query(q), q, cursor, limit, lambda i, e: events.put(('entry', e)))
+            if first: meta_cache.put('search', q, results)
+            events.put(('next', cursor + len(results) if more and results else None))
+        except Exception as e:
+            errors_total.inc(route=current_route.get(), exception=type(e).__name__)
+            events.put(('error', str(e)))
+    search_stream_pool.submit(copy_context().run, run)
+    try:
+        while True:
+            kind, data = events.get()
+            yield kind, data
+            if kind != 'entry': return
+    finally:
+        gone.set()
 
-@app.route('/api/search')
+def ndjson_events(events):
+    # One entry per line; the last line is {"next_cursor": ...} or {"error": ...}
+    for kind, data in events:
+        yield json.dumps(data if kind == 'entry' else { 'next_cursor' if kind == 'next' else 'error': data }) + '\n'
+
+def sse_events(events):
+    for kind, data in events: yield f'event: {kind}\ndata: {json.dumps(data)}\n\n'
+
+def stream_mode(params, accept):
+    # ?stream=1 (or ndjson) streams NDJSON, ?stream=sse or an EventSource's Accept header streams SSE
+    mode = params.get('stream')
+    if mode == 'sse' or (not mode and 'text/event-stream' in accept): return 'sse'
+    return 'ndjson' if mode in ('1', 'ndjson') else None
+
+STREAM_TYPES = { 'ndjson': ('application/x-ndjson', ndjson_events), 'sse': ('text/event-stream', sse_events) }
+# Proxies such as nginx would otherwise buffer the stream and hand it over in one piece
+STREAM_HEADERS = { 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no' }
+
+def page_args(params):
+    # Raises ValueError for a bad cursor/limit. Buffers stop at max_results, so a cursor past that
+    # would only pull every page upstream to answer an empty one
+    cursor, limit = int(params.get('cursor') or 0), int(params.get('limit') or SEARCH_PAGE_SIZE)
+    if not 0 <= cursor < search_buffers.max_results or not 1 <= limit <= SEARCH_MAX_PAGE_SIZE: raise ValueError(cursor, limit)
+    return cursor, limit
+
+def page_args_error():
+    return f"Parameter 'cursor'/'limit' tidak valid (cursor 0-{search_buffers.max_results - 1}, limit 1-{SEARCH_MAX_PAGE_SIZE})"
+
+def next_page_headers(q, limit, next_cursor):
+    if next_cursor is None: return {}
+    extra = f'&limit={limit}' if limit != SEARCH_PAGE_SIZE else ''
+    return { 'X-Next-Cursor': str(next_cursor), 'Link': f'</api/search?q={quote(q)}&cursor={next_cursor}{extra}>; rel="next"' }
+
+@bp.route('/api/search')
 def search():
     q = request.args.get('q')
     if not q: return jsonify({ 'error': "Parameter 'q' diperlukan" }), 400
+    try: cursor, limit = page_args(request.args)
+    except ValueError: return jsonify({ 'error': page_args_error() }), 400
+    log.info(f"Mencari video: {q}" + (f" (dari {cursor})" if cursor else ''))
+    mode = stream_mode(request.args, request.headers.get('Accept', ''))
+    if mode:
+        mimetype, encode = STREAM_TYPES[mode]
+        return Response(encode(search_events(q, cursor, limit)), mimetype=mimetype, headers=STREAM_HEADERS)
     try:
-        app.logger.info(f"Mencari video: {q}")
-        ydl_opts = { 'quiet': True, 'extract_flat': 'in_playlist', 'default_search': 'ytsearch10:' }
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(q, download=False)
-            entries = info.get('entries',[]) or []
-            results = [
-                {'id': v.get('id'), 'title': v.get('title','Tanpa judul'),
-                 'url': v.get('url'), 'thumbnail': v.get('thumbnails',[{}])[-1].get('url'),
-                 'author': v.get('uploader','Unknown')} for v in entries if v
-            ]
-        return jsonify(results)
+        results, next_cursor = search_page(q, cursor, limit)
+        resp = api_json(results)
+        resp.headers.update(next_page_headers(q, limit, next_cursor))
+        return resp
     except Exception as e:
-        return jsonify({ 'error': str(e) }), 500
+        return api_error(e)
+
+def batch_item(i, q, future):
+    try: return { 'index': i, 'query': q, 'results': future.result() }
+    except Exception as e: return { 'index': i, 'query': q, 'error': str(e) }
+
+@bp.route('/api/search/batch', methods=['POST'])
+def search_batch():
+    queries = (request.get_json(silent=True) or {}).get('queries')
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        return jsonify({ 'error': "Parameter 'queries' (list of strings) diperlukan" }), 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({ 'error': f'Maksimal {BATCH_MAX_QUERIES} query per batch' }), 400
+    log.info(f"Mencari batch: {len(queries)} query")
+    # Repeated queries (after normalisation) share one upstream search
+    futures = {}
+    for q in queries:
+        norm = normalize_query(q)
+        if norm not in futures: futures[norm] = batch_pool.submit(copy_context().run, search_results, q)
+    if request.args.get('stream') == '1':
+        def generate():
+            waiting = {}
+            for i, q in enumerate(queries): waiting.setdefault(futures[normalize_query(q)], []).append((i, q))
+            for future in as_completed(waiting):
+                for i, q in waiting[future]: yield json.dumps(batch_item(i, q, future)) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson')
+    return jsonify([batch_item(i, q, futures[normalize_query(q)]) for i, q in enumerate(queries)])
+
+@bp.route('/api/cache/meta')
+def meta_cache_stats(): return jsonify(meta_cache.stats())
+
+@bp.route('/metrics')
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/api/transcode')
+def transcode_stats(): return jsonify(transcoder.stats())
+
+@bp.route('/api/suggest/index')
+def suggest_index_stats(): return jsonify(suggest_index.stats())
+
+@bp.route('/api/pool')
+def pool_stats(): return jsonify(ydl_pool.stats())
+
+@bp.route('/api/upstream')
+def upstream_stats(): return jsonify(upstream.stats())
+
+@bp.route('/api/search/buffers')
+def search_buffer_stats(): return jsonify(search_buffers.stats())
+
+@bp.route('/api/random_suggestions/pool')
+def random_pool_stats(): return jsonify(random_pool.stats())
+
+def send_cached(entry):
+    # conditional=True + a content-hash ETag: Range, If-Range and If-None-Match work for completed artifacts
+    ext = entry['file'].rsplit('.',1)[-1]
+    start, route = time.perf_counter(), current_route.get()
+    # Pinned until the body has been written out, so the storage manager cannot evict it mid-send
+    download_cache.pin(entry)
+    try:
+        resp = send_file(os.path.abspath(download_cache.path(entry)), as_attachment=True,
+                         download_name=f"{entry['title']}.{ext}", conditional=True, etag=entry['sha256'])
+    except BaseException:
+        download_cache.unpin(entry)
+        raise
+    def done():
+        download_cache.unpin(entry)
+        stage_seconds.observe(time.perf_counter() - start, route=route, stage='send_file')
+    # send_file responses are direct-passthrough, which bypasses call_on_close; the WSGI server closes this instead
+    resp.response = ClosingIterator(resp.response, done)
+    return resp
+
+def attachment_header(name):
+    simple = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().replace('"', '')
+    return f"attachment; filename=\"{simple}\"; filename*=UTF-8''{quote(name)}"
+
+def requested_format(params):
+    # mp3/opus/m4a are audio presets (mp3 takes quality=128|192|320); anything else is mp4, named by its policy.
+    # The policy (max_height, max_bytes, transcode=1) only steers which stream is fetched, see formats.rank.
+    # Raises ValueError for non-numeric limits.
+    fmt, policy = params.get('format'), parse_policy(params)
+    if fmt in DEFAULT_PRESET: return fmt, preset_for(fmt, params.get('quality')), policy
+    return 'mp4', policy_tag(policy), policy
+
+def download_profile(fmt, quality, policy):
+    # Pool profile and selector; resolved info is keyed by what decides the chosen format
+    profile = 'download-mp4' if fmt=='mp4' else 'download-audio'
+    return profile, f'{profile}/{quality}/{policy_tag(policy)}', selector(policy, None if fmt=='mp4' else quality)
 
-@app.route('/api/download')
+def resolve(ydl, profile, url, vid):
+    # Format info resolved earlier skips the player/signature extraction until its signed URL expires
+    info = resolved_cache.get(vid, profile) if vid else None
+    if info is not None: return info, True
+    with stage('extract'): info = ydl.extract_info(url, download=False)
+    resolved_cache.put(profile, info)
+    return info, False
+
+def stream_artifact(url, fmt, quality, policy):
+    # Sends bytes while they are fetched (and for audio, while ffmpeg encodes) and keeps a copy for the cache
+    profile, rkey, select = download_profile(fmt, quality, policy)
+    with ydl_pool.checkout(profile, format_selector=select) as ydl: info, _ = resolve(ydl, rkey, url, video_id_from_url(url))
+    key = DownloadCache.key(info['id'], fmt, quality)
+    entry = download_cache.get(key, count=False)
+    if entry: return send_cached(entry)
+    if info.get('protocol') not in ('http', 'https') or not info.get('url'): return None
+    title = info.get('title') or info['id']
+    try:
+        source = primed(iter_http(info['url'], info.get('http_headers'), info.get('filesize')))
+    except Exception as e:
+        # The signed URL may be revoked or bound to another egress IP; the regular path extracts it again
+        log.info(f"Streaming {info['id']} failed to start ({e}), falling back to a full download")
+        resolved_cache.discard(info['id'], rkey)
+        return None
+    if fmt=='mp4':
+        ext = info.get('ext', 'mp4')
+        body, mimetype, length = source, f'video/{ext}', info.get('filesize')
+    else:
+        preset = PRESETS[quality]
+        try: body = transcoder.piped(quality, source, info.get('acodec'))
+        except BaseException:
+            source.close()
+            raise
+        if body is None:
+            # Every encoder is busy; the regular path queues for one
+            source.close()
+            return None
+        ext, mimetype, length = preset['ext'], preset['mime'], None
+    # Piped output differs byte for byte from the regular path's file, and concurrent streams of the same
+    # artifact each finish their own copy, so every stream gets a name of its own
+    path = os.path.join(DOWNLOAD_FOLDER, f"{info['id']}-{quality if fmt!='mp4' else 'mp4-' + quality}-stream-{uuid.uuid4().hex[:12]}.{ext}")
+    def finish(p, sha256):
+        # A download or stream that finished meanwhile keeps its entry (and the ETag clients have seen)
+        if download_cache.get(key, count=False): os.remove(p)
+        else: download_cache.put(key, p, title, sha256)
+    body = tee_to_file(body, path, finish)
+    resp = Response(body, mimetype=mimetype, headers={'Content-Disposition': attachment_header(f'{title}.{ext}')})
+    if length: resp.headers['Content-Length'] = str(length)
+    return resp
+
+def produce_artifact(url, fmt, quality, vid, policy, job=None):
+    # Runs as the single-flight leader; another process may have finished it while we waited
+    if vid:
+        entry = download_cache.get(DownloadCache.key(vid, fmt, quality), count=False)
+        if entry: return entry
+    log.info(f"Downloading: {url} as {fmt} ({quality})")
+    hooks = { 'progress_hooks': [job.progress_hook], 'postprocessor_hooks': [job.postprocessor_hook] } if job else {}
+    profile, rkey, select = download_profile(fmt, quality, policy)
+    with ydl_pool.checkout(profile, format_selector=select, **hooks) as ydl:
+        info, cached = resolve(ydl, rkey, url, vid)
+        def fetch(key):
+            entry = download_cache.get(key, count=False)
+            if entry: return entry
+            part = ydl.prepare_filename(info) + '.part'
+            if os.path.exists(part): log.info(f"Resuming {info['id']} from {os.path.getsize(part)} bytes")
+            try:
+                with stage('download'): done = ydl.process_ie_result(info, download=True)
+            except Exception as e:
+                # A cached URL can stop working before its expiry (revoked, different egress IP); resolve once more
+                if not cached: raise
+                log.info(f"Cached format info for {info['id']} failed ({e}), extracting again")
+                resolved_cache.discard(info['id'], rkey)
+                with stage('extract'): fresh = ydl.extract_info(url, download=False)
+                resolved_cache.put(rkey, fresh)
+                with stage('download'): done = ydl.process_ie_result(fresh, download=True)
+            return download_cache.put(key, ydl.prepare_filename(done), done.get('title') or done['id'])
+        key = DownloadCache.key(info['id'], fmt, quality)
+        # Keyed by the chosen stream, so URLs without a recognisable id converge on the real id and
+        # policies that pick the same stream share its fetch (and its file) instead of writing it twice;
+        # the cache keeps that file until the last policy's entry naming it goes
+        if fmt=='mp4': return download_flights.do(DownloadCache.key(info['id'], 'mp4', info.get('format_id')), lambda: fetch(key))
+        # The audio source is cached on its own so other presets picking it re-encode it without refetching
+        src_key = DownloadCache.key(info['id'], 'audio', info.get('format_id') or 'source')
+        src = download_cache.get(src_key, count=False) or download_flights.do(src_key, lambda: fetch(src_key))
+    def encode():
+        entry = download_cache.get(key, count=False)
+        if entry: return entry
+        if job: job.progress = { 'stage': 'transcode', 'preset': quality }
+        with stage('postprocess'), download_cache.pinned(src):
+            result = transcoder.transcode(quality, download_cache.path(src), os.path.join(DOWNLOAD_FOLDER, f"{info['id']}-{quality}"),
+                                          info.get('acodec'), info.get('duration'))
+        log.info(f"Transcode {info['id']} -> {quality}: {result['seconds']}s, {result['rtf']}x realtime"
+                        + (' (remux)' if result['remuxed'] else ''))
+        if job: job.progress = { 'stage': 'transcode', **{ k: v for k, v in result.items() if k != 'path' } }
+        return download_cache.put(key, result['path'], src['title'])
+    return encode() if info['id'] == vid else download_flights.do(key, encode)
+
+def download_key(url, fmt, quality, vid):
+    return DownloadCache.key(vid, fmt, quality) if vid else f'url:{url}:{fmt}:{quality}'
+
+def fetch_shared(key):
+    with stage('store_fetch'): meta = artifact_store.fetch(key, DOWNLOAD_FOLDER)
+    return meta and download_cache.put(key, os.path.join(DOWNLOAD_FOLDER, meta['file']), meta['title'], meta['sha256'])
+
+def produce_shared(url, fmt, quality, vid, policy, job=None):
+    # With a shared store, replicas reuse each other's artifacts and the store lock picks one producer;
+    # the others wait in lock() and then find the artifact in the store
+    if artifact_store is None or not vid: return produce_artifact(url, fmt, quality, vid, policy, job)
+    key = download_key(url, fmt, quality, vid)
+    entry = fetch_shared(key)
+    if entry: return entry
+    with artifact_store.lock(key):
+        entry = download_cache.get(key, count=False) or fetch_shared(key)
+        if entry: return entry
+        entry = produce_artifact(url, fmt, quality, vid, policy, job)
+        try:
+            with stage('store_upload'), download_cache.pinned(entry):
+                artifact_store.upload(key, download_cache.path(entry), entry['title'], entry['sha256'])
+        except Exception as e:
+            log.warning(f"Upload {key} ke store gagal: {e}")
+        return entry
+
+@bp.route('/api/download')
 def download_file():
     url = request.args.get('url')
-    fmt = request.args.get('format','mp4')
     if not url: return jsonify({ 'error': "Parameter 'url' diperlukan" }), 400
+    try: fmt, quality, policy = requested_format(request.args)
+    except ValueError: return jsonify({ 'error': "Parameter 'max_height'/'max_bytes' harus angka" }), 400
+    try:
+        # Fast path: the video id is in the URL, so a hit never touches yt-dlp
+        vid = video_id_from_url(url)
+        key = download_key(url, fmt, quality, vid)
+        entry = download_cache.get(key) if vid else None
+        if entry:
+            log.info(f"Cache hit: {vid} as {fmt} ({quality})")
+            return send_cached(entry)
+        if request.args.get('stream') == '1':
+            resp = stream_artifact(url, fmt, quality, policy)
+            if resp is not None: return resp
+        entry = download_flights.do(key, lambda: produce_shared(url, fmt, quality, vid, policy))
+        return send_cached(entry)
+    except Exception as e:
+        return api_error(e)
+
+def get_artifact(url, fmt, quality, policy, job=None):
+    vid = video_id_from_url(url)
+    key = download_key(url, fmt, quality, vid)
+    entry = download_cache.get(key) if vid else None
+    return entry or download_flights.do(key, lambda: produce_shared(url, fmt, quality, vid, policy, job))
+
+def run_download_job(job):
+    current_route.set('/api/jobs')
+    p = job.params
+    return get_artifact(p['url'], p['format'], p['quality'], p['policy'], job)
+
+def playlist_videos(ydl, info, depth=2):
+    # Yields (video id, entry) in listing order. Channel roots list their tabs (Videos, Shorts, Live) instead
+    # of videos, as nested playlists or, flat, as bare tab URLs; those are expanded in turn.
+    for e in info.get('entries') or []:
+        if not e: continue
+        vid = e.get('_type') != 'playlist' and video_id_from_url(e.get('url') or e.get('id') or '')
+        if vid: yield vid, e
+        elif depth and e.get('_type') in ('playlist', 'url'):
+            if 'entries' not in e:
+                if not (e.get('url') or e.get('webpage_url')): continue
+                e = ydl.extract_info(e.get('url') or e['webpage_url'], download=False)
+            yield from playlist_videos(ydl, e, depth - 1)
+
+@bp.route('/api/download/playlist')
+def download_playlist():
+    url = request.args.get('url')
+    if not url: return jsonify({ 'error': "Parameter 'url' diperlukan" }), 400
+    try:
+        fmt, quality, policy = requested_format(request.args)
+        concurrency = min(max(int(request.args.get('concurrency', 3)), 1), PLAYLIST_MAX_CONCURRENCY)
+    except ValueError: return jsonify({ 'error': "Parameter 'concurrency'/'max_height'/'max_bytes' harus angka" }), 400
     try:
-        app.logger.info(f"Downloading: {url} as {fmt}")
-        ydl_opts = {
-            'format': 'bestaudio/best' if fmt=='mp3' else 'best',
-            'outtmpl': f'{DOWNLOAD_FOLDER}/%(title)s.%(ext)s',
-            'quiet': True,
-            'postprocessors': [{ 'key':'FFmpegExtractAudio','preferredcodec':'mp3' }] if fmt=='mp3' else []
-        }
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            filename = ydl.prepare_filename(info)
-            if fmt=='mp3': filename = filename.rsplit('.',1)[0] + '.mp3'
-        return send_file(filename, as_attachment=True)
+        with ydl_pool.checkout('flat-playlist') as ydl, stage('extract'):
+            info = ydl.extract_info(url, download=False)
+            # Videos listed under two tabs (a premiere under Videos and Live) are downloaded once
+            entries, seen = [], set()
+            for vid, e in playlist_videos(ydl, info):
+                if vid in seen: continue
+                seen.add(vid)
+                entries.append(e)
+                if len(entries) >= PLAYLIST_MAX_ITEMS: break
     except Exception as e:
-        return jsonify({ 'error': str(e) }), 500
+        return api_error(e)
+    if not entries: return jsonify({ 'error': 'Tidak ada video di playlist ini' }), 404
+    title = info.get('title') or info.get('id') or 'playlist'
+    log.info(f"Downloading playlist: {url} ({len(entries)} video) as {fmt}")
+
+    def generate():
+        # Items already in the cache resolve immediately; the rest download concurrently.
+        # Archive members are written in completion order so nothing waits on the slowest item.
+        executor = ThreadPoolExecutor(concurrency, thread_name_prefix='playlist')
+        futures = { executor.submit(copy_context().run, get_artifact, e.get('url') or e['id'], fmt, quality, policy): (i, e) for i, e in enumerate(entries) }
+        errors, pinned = [], []
+        def files():
+            for future in as_completed(futures):
+                i, e = futures[future]
+                try: entry = future.result()
+                except Exception as ex:
+                    errors.append(f"{e.get('title') or e.get('id')}: {ex}")
+                    continue
+                name = entry['title'].replace('/', '_').replace('\\', '_')
+                download_cache.pin(entry)
+                pinned.append(entry)
+                yield f"{i+1:03d} - {name}.{entry['file'].rsplit('.',1)[-1]}", download_cache.path(entry)
+            if errors: yield 'errors.txt', '\n'.join(errors).encode()
+        try: yield from iter_zip(files())
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            for entry in pinned: download_cache.unpin(entry)
+
+    return Response(generate(), mimetype='application/zip', headers={'Content-Disposition': attachment_header(f'{title}.zip')})
+
+def job_view(job):
+    data = job.to_dict()
+    data['status_url'] = f'/api/jobs/{job.id}'
+    if job.status == 'done': data['download_url'] = f'/api/jobs/{job.id}/file'
+    return data
+
+def format_table(url):
+    with ydl_pool.checkout('download-mp4', format_selector=selector(parse_policy({}))) as ydl, stage('extract'):
+        info = ydl.extract_info(url, download=False)
+    duration = info.get('duration')
+    return { 'id': info['id'], 'title': info.get('title'), 'duration': duration,
+             'formats': [summarize(f, duration) for f in info.get('formats') or [info]] }
+
+def ranked_formats(url, fmt, quality, policy):
+    # Every stream the video offers, ranked for this format/quality/policy; the first is what a download fetches.
+    # Video ids are case-sensitive, so they are not normalised like search queries.
+    table = meta_cache.get('formats', video_id_from_url(url) or url, lambda: format_table(url), *META_TTL['formats'],
+                           normalize=str.strip)
+    ranked = rank(table['formats'], policy, None if fmt=='mp4' else quality, table['duration'])
+    return { **table, 'formats': ranked, 'chosen': ranked[0]['format_id'] if ranked else None,
+             'format': fmt, 'quality': quality, 'policy': policy }
+
+@bp.route('/api/formats')
+def list_formats():
+    url = request.args.get('url')
+    if not url: return jsonify({ 'error': "Parameter 'url' diperlukan" }), 400
+    try: fmt, quality, policy = requested_format(request.args)
+    except ValueError: return jsonify({ 'error': "Parameter 'max_height'/'max_bytes' harus angka" }), 400
+    try:
+        return api_json(ranked_formats(url, fmt, quality, policy))
+    except Exception as e:
+        return api_error(e)
+
+@bp.route('/api/jobs', methods=['POST'])
+def create_job():
+    params = request.get_json(silent=True) or request.form
+    url = params.get('url')
+    if not url: return jsonify({ 'error': "Parameter 'url' diperlukan" }), 400
+    try: fmt, quality, policy = requested_format(params)
+    except ValueError: return jsonify({ 'error': "Parameter 'max_height'/'max_bytes' harus angka" }), 400
+    try:
+        job = job_queue.submit(run_download_job, url=url, format=fmt, quality=quality, policy=policy)
+    except QueueFull:
+        return jsonify({ 'error': 'Antrian penuh, coba lagi nanti' }), 503, { 'Retry-After': '30' }
+    return jsonify(job_view(job)), 202, { 'Location': f'/api/jobs/{job.id}' }
+
+@bp.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if not job: return jsonify({ 'error': 'Job tidak ditemukan' }), 404
+    return jsonify(job_view(job))
+
+@bp.route('/api/jobs/<job_id>/file')
+def get_job_file(job_id):
+    job = job_queue.get(job_id)
+    if not job: return jsonify({ 'error': 'Job tidak ditemukan' }), 404
+    if job.status != 'done': return jsonify(job_view(job)), 409
+    # The artifact may have been evicted since the job finished
+    if not os.path.isfile(download_cache.path(job.result)):
+        return jsonify({ 'error': 'File sudah dihapus, buat job baru' }), 410
+    return send_cached(job.result)
+
+@bp.route('/api/jobs')
+def job_stats(): return jsonify(job_queue.stats())
+
+@bp.route('/api/thumb/<video_id>')
+def thumbnail(video_id):
+    size = request.args.get('size', current_app.config['THUMB_SIZE'])
+    if size not in THUMB_SIZES or video_id_from_url(video_id) != video_id:
+        return jsonify({ 'error': 'Thumbnail tidak valid' }), 400
+    try:
+        path = thumb_cache.get(video_id, size)
+    except ThumbNotFound:
+        return jsonify({ 'error': 'Thumbnail tidak ditemukan' }), 404
+    except Exception as e:
+        return api_error(e)
+    # Names are immutable per (id, size), so browsers and CDNs may keep them for a long time
+    resp = send_file(os.path.abspath(path), mimetype='image/jpeg', max_age=THUMB_MAX_AGE, conditional=True)
+    resp.cache_control.immutable = True
+    return resp
+
+@bp.route('/api/thumb')
+def thumb_stats(): return jsonify(thumb_cache.stats())
+
+@bp.route('/api/resolved')
+def resolved_stats(): return jsonify(resolved_cache.stats())
+
+@bp.route('/api/store')
+def store_stats(): return jsonify(artifact_store.stats() if artifact_store else { 'backend': None })
+
+@bp.route('/api/storage')
+def storage_stats(): return jsonify(storage.stats())
+
+@bp.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({**download_cache.stats(), 'coalesced': download_flights.coalesced,
+                    'in_flight': download_flights.in_flight()})
+
+def create_app(ui=None, **config):
+    """Builds the app; ``ui`` (or $UI_VARIANT) picks the page template, see UI_VARIANTS."""
+    ui = ui or os.environ.get('UI_VARIANT', 'grid')
+    if ui not in UI_VARIANTS: raise ValueError(f'UI tidak dikenal: {ui}')
+    app = Flask(__name__)
+    app.logger.setLevel(logging.DEBUG)
+    app.config.update(UI_VARIANT=ui, THUMB_SIZE=UI_VARIANTS[ui][1], **config)
+    app.register_blueprint(bp)
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=3001, debug=True)
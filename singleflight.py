@@ -0,0 +1,104 @@
+import hashlib, os, threading, time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = self.error = None
+        self.waiters = 0
+        self.owner = threading.get_ident()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight block and receive the same result (or exception). With
+    ``lock_dir`` set, the leader additionally holds an ``flock`` on a
+    per-key lock file so only one process produces a given artifact;
+    ``prune`` deletes the lock files of keys nobody has used for a while.
+    """
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+        if lock_dir: os.makedirs(lock_dir, exist_ok=True)
+
+    @contextmanager
+    def _file_lock(self, key):
+        if not (self.lock_dir and fcntl):
+            yield
+            return
+        path = os.path.join(self.lock_dir, hashlib.sha1(key.encode()).hexdigest() + '.lock')
+        while True:
+            f = open(path, 'a')
+            fcntl.flock(f, fcntl.LOCK_EX)
+            # prune() may have deleted the file while we waited on it; then lock the one at the path now
+            try: current = os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+            except FileNotFoundError: current = False
+            if current: break
+            f.close()
+        try:
+            os.utime(f.fileno())   # last use, for prune()
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def prune(self, max_age):
+        """Deletes lock files unused for ``max_age`` seconds that no process holds; returns how many."""
+        if not (self.lock_dir and fcntl): return 0
+        now, pruned = time.time(), 0
+        with os.scandir(self.lock_dir) as it:
+            for e in it:
+                if not e.name.endswith('.lock'): continue
+                try:
+                    if now - e.stat().st_mtime < max_age: continue
+                    with open(e.path, 'a') as f:
+                        # Deleted while held, so a process that opened it before sees it is stale and retries
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        os.remove(e.path)
+                except OSError: continue
+                pruned += 1
+        return pruned
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader: call = self.calls[key] = _Call()
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None: raise call.error
+            return call.result
+        try:
+            with self._file_lock(key):
+                call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock: del self.calls[key]
+            call.done.set()
+
+    def shared(self, key):
+        # Whether aborting ``key`` would fail anyone else: counts waiters on the flights its leader started
+        # inside it too, since those run (and fail) in the same thread
+        with self.lock:
+            call = self.calls.get(key)
+            return bool(call) and any(c.waiters for c in self.calls.values() if c.owner == call.owner)
+
+    def in_flight(self):
+        with self.lock: return len(self.calls)
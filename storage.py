@@ -0,0 +1,108 @@
+import logging, os, shutil, threading, time
+
+log = logging.getLogger(__name__)
+
+
+class StorageManager:
+    """Keeps a download folder under a byte quota.
+
+    A low-priority background thread sweeps ``folder`` every ``interval``
+    seconds. Files that no cache entry references (``.part`` files of
+    interrupted fetches and encodes, streamed copies a finished download
+    got to first, files whose entry was replaced) are deleted once older
+    than ``orphan_age``, so anything still being written is left alone, as
+    are the lock files of ``flights`` (a SingleFlight) unused for as long.
+    When usage passes ``high`` * quota, cache entries are evicted
+    (``policy`` 'lru' or 'lfu') until it is back under ``low`` * quota;
+    entries the cache has pinned are skipped. ``cache`` may be None, in
+    which case only orphans are managed.
+    """
+
+    def __init__(self, folder, cache=None, quota=2 * 1024**3, high=0.9, low=0.75, policy='lru',
+                 interval=60.0, orphan_age=3600.0, flights=None):
+        if policy not in ('lru', 'lfu'): raise ValueError(f'Policy tidak dikenal: {policy}')
+        self.folder, self.cache, self.quota = folder, cache, quota
+        self.high, self.low, self.policy = high, low, policy
+        self.interval, self.orphan_age = interval, orphan_age
+        self.flights = flights
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.usage = {}
+        self.sweeps = self.orphans_deleted = self.orphan_bytes_deleted = self.bytes_evicted = self.locks_pruned = 0
+        self.last_sweep = None
+        self._thread = None
+
+    def _scan(self):
+        # Top-level files only: dotfiles (indexes) and subdirectories (locks) are not artifacts
+        files = []
+        with os.scandir(self.folder) as it:
+            for e in it:
+                if e.name.startswith('.') or not e.is_file(follow_symlinks=False): continue
+                try: st = e.stat(follow_symlinks=False)
+                except OSError: continue
+                files.append((e.name, st.st_size, st.st_mtime))
+        return files
+
+    def _usage(self, files, referenced):
+        cached = sum(size for name, size, _ in files if name in referenced)
+        parts = [(n, s) for n, s, _ in files if n.endswith('.part')]
+        return {'bytes': sum(size for _, size, _ in files), 'files': len(files), 'cached_bytes': cached,
+                'unreferenced_bytes': sum(size for _, size, _ in files) - cached,
+                'part_files': len(parts), 'part_bytes': sum(s for _, s in parts)}
+
+    def sweep(self):
+        referenced = self.cache.files() if self.cache else set()
+        now, deleted, freed = time.time(), 0, 0
+        for name, size, mtime in self._scan():
+            if name in referenced or now - mtime < self.orphan_age: continue
+            try: os.remove(os.path.join(self.folder, name))
+            except OSError: continue
+            deleted, freed = deleted + 1, freed + size
+        if deleted: log.info('Storage: %d file yatim dihapus (%d bytes)', deleted, freed)
+        # Every key ever produced leaves a lock file behind; evicted and one-off keys' go once idle
+        pruned = self.flights.prune(self.orphan_age) if self.flights else 0
+        files = self._scan()
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        if self.cache and total > self.high * self.quota:
+            evicted = self.cache.shrink(total - int(self.low * self.quota), self.policy)
+            log.info('Storage: %d/%d bytes, %d bytes di-evict (%s)', total, self.quota, evicted, self.policy)
+            files = self._scan()
+            referenced = self.cache.files()
+        with self.lock:
+            self.usage = self._usage(files, referenced)
+            self.sweeps += 1
+            self.orphans_deleted += deleted
+            self.orphan_bytes_deleted += freed
+            self.bytes_evicted += evicted
+            self.locks_pruned += pruned
+            self.last_sweep = time.time()
+
+    def _run(self):
+        # Background housekeeping should not compete with request threads for CPU
+        try: os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError): pass
+        while True:
+            try: self.sweep()
+            except Exception as e: log.warning('Storage sweep gagal: %s', e)
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def start(self):
+        with self.lock:
+            if self._thread: return self
+            self._thread = threading.Thread(target=self._run, name='storage', daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self): self.wakeup.set()
+
+    def stats(self):
+        disk = shutil.disk_usage(self.folder)
+        with self.lock:
+            return {**self.usage, 'quota': self.quota, 'high_watermark': int(self.high * self.quota),
+                    'low_watermark': int(self.low * self.quota), 'policy': self.policy,
+                    'disk_total': disk.total, 'disk_free': disk.free, 'sweeps': self.sweeps,
+                    'last_sweep': self.last_sweep, 'orphans_deleted': self.orphans_deleted,
+                    'orphan_bytes_deleted': self.orphan_bytes_deleted, 'bytes_evicted': self.bytes_evicted,
+                    'locks_pruned': self.locks_pruned}
@@ -0,0 +1,124 @@
+import hashlib, os, shutil, subprocess, threading, urllib.request, zipfile
+
+CHUNK_SIZE = 64 * 1024
+# googlevideo throttles long single requests; fetch in ranged pieces like yt-dlp's http_chunk_size
+RANGE_SIZE = 10 * 1024 * 1024
+
+
+def iter_http(url, headers=None, filesize=None, chunk_size=CHUNK_SIZE, range_size=RANGE_SIZE):
+    headers = dict(headers or {})
+    start = 0
+    while True:
+        end = start + range_size - 1
+        req = urllib.request.Request(url, headers={**headers, 'Range': f'bytes={start}-{end}'})
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            got = 0
+            while True:
+                chunk = resp.read(chunk_size)
+                if not chunk: break
+                got += len(chunk)
+                yield chunk
+            # Server ignored the Range header and sent the whole body
+            if resp.status == 200: return
+        start += got
+        if got < range_size or (filesize and start >= filesize): return
+
+
+def primed(chunks):
+    """Runs ``chunks`` up to its first chunk now, so a source that cannot be opened fails here rather than
+    after a response has been committed; returns an iterator over the same chunks."""
+    first = next(chunks, None)
+    def rest():
+        try:
+            if first is not None: yield first
+            yield from chunks
+        finally:
+            chunks.close()
+    return rest()
+
+
+def iter_ffmpeg(source, args, chunk_size=CHUNK_SIZE):
+    """Pipes ``source`` chunks through ``ffmpeg -i pipe:0 <args> pipe:1`` and yields its stdout."""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg: raise RuntimeError('ffmpeg tidak ditemukan')
+    proc = subprocess.Popen([ffmpeg, '-loglevel', 'error', '-i', 'pipe:0', *args, 'pipe:1'],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    feed_error = []
+
+    def feed():
+        try:
+            for chunk in source: proc.stdin.write(chunk)
+        except Exception as e:  # BrokenPipe when ffmpeg is killed, network errors otherwise
+            feed_error.append(e)
+        finally:
+            try: proc.stdin.close()
+            except OSError: pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        while True:
+            chunk = proc.stdout.read(chunk_size)
+            if not chunk: break
+            yield chunk
+        if proc.wait() != 0: raise RuntimeError(f'ffmpeg gagal ({proc.returncode})')
+        if feed_error: raise feed_error[0]
+    finally:
+        if proc.poll() is None: proc.kill()
+        proc.stdout.close()
+        feeder.join(timeout=1)
+
+
+def tee_to_file(chunks, path, on_complete):
+    """Yields ``chunks`` while writing them to ``path + '.part'``; renames and calls ``on_complete(path, sha256)``
+    only if the stream ran to the end, so an aborted client never leaves a truncated artifact behind."""
+    part = f'{path}.{os.getpid()}-{threading.get_ident()}.part'
+    ok, digest = False, hashlib.sha256()
+    try:
+        with open(part, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                yield chunk
+        ok = True
+    finally:
+        if hasattr(chunks, 'close'): chunks.close()
+        if ok:
+            os.replace(part, path)
+            on_complete(path, digest.hexdigest())
+        else:
+            try: os.remove(part)
+            except OSError: pass
+
+
+class _ChunkSink:
+    # Write-only, unseekable file object; zipfile then emits data descriptors instead of seeking back
+    def __init__(self): self.chunks = []
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+    def flush(self): pass
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def iter_zip(files, chunk_size=CHUNK_SIZE):
+    """Builds a zip archive on the fly from ``(arcname, path_or_bytes)`` pairs and yields it in pieces.
+    Members are stored uncompressed: media files do not shrink and deflate would cost CPU per request."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as zf:
+        for arcname, src in files:
+            if isinstance(src, bytes):
+                zf.writestr(arcname, src)
+            else:
+                with open(src, 'rb') as f, zf.open(arcname, 'w', force_zip64=True) as dst:
+                    while True:
+                        chunk = f.read(chunk_size)
+                        if not chunk: break
+                        dst.write(chunk)
+                        data = sink.drain()
+                        if data: yield data
+            data = sink.drain()
+            if data: yield data
+    yield sink.drain()
@@ -0,0 +1,215 @@
+import bisect, gzip, heapq, itertools, logging, os, re, threading, time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+TOKEN_RE = re.compile(r'\w+')
+# Rows handed to the index per lock hold while loading, so ingests and queries interleave with a long load
+LOAD_BATCH = 5000
+# Most matches ranked per lookup; only short or very common prefixes match more, and any of those will do
+RANK_LIMIT = 1000
+
+def tokenize(text): return TOKEN_RE.findall(text.casefold())
+
+def _clean(s): return (s or '').replace('\t', ' ').replace('\n', ' ')
+
+def _row(vid, title, uploader, seen): return f'{vid}\t{title}\t{uploader}\t{seen}\n'
+
+
+class SuggestIndex:
+    """Local token-prefix index over video metadata seen by the app.
+
+    Documents are (id -> title, uploader, seen-count), capped at
+    ``max_entries`` with the least recently seen evicted first, so memory
+    stays bounded however many results flow through. Lookups bisect a
+    sorted token vocabulary for the last (partial) query word and
+    intersect its postings with those of the other (whole) words. A
+    background thread merges new tokens into the vocabulary every
+    ``rebuild_interval`` seconds (until then they are scanned linearly),
+    and answers are reused for as long, which is what keeps one- and
+    two-letter prefixes cheap.
+
+    The index is persisted at ``path`` as a gzipped TSV snapshot plus an
+    append-only log (``path``.log) that the same thread appends each
+    ingest to every ``save_interval`` seconds; once the log outgrows the
+    snapshot the two are compacted into a new snapshot. Both are loaded
+    on first use; until then ``query`` returns nothing.
+    """
+
+    def __init__(self, path=None, max_entries=200_000, rebuild_interval=5.0, save_interval=30.0, compact_min=10_000):
+        self.path = path
+        self.log_path = f'{path}.log' if path else None
+        self.max_entries = max_entries
+        self.rebuild_interval = rebuild_interval
+        self.save_interval = save_interval
+        self.compact_min = compact_min
+        self.lock = threading.RLock()
+        self.save_lock = threading.Lock()
+        self.docs = OrderedDict()      # id -> (title, uploader, seen)
+        # token -> id, or a set of ids once a second document has it (most tokens are only ever in one)
+        self.postings = {}
+        self.vocab, self.pending = [], set()
+        self.recent = OrderedDict()    # (casefolded query, limit) -> (answered at, titles)
+        self.journal = []              # log rows not yet appended to the file
+        self.log_rows = 0
+        self.damaged = False
+        self.loaded = path is None
+        self._load_started = False
+
+    def _ensure_loaded(self):
+        if self._load_started: return
+        self._load_started = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        if self.path: self._load()
+        saved = time.monotonic()
+        while True:
+            time.sleep(self.rebuild_interval)
+            self._merge_vocab()
+            if self.path and time.monotonic() - saved >= self.save_interval:
+                saved = time.monotonic()
+                try: self.save()
+                except OSError as e: log.warning('Gagal menyimpan suggest index: %s', e)
+
+    def _merge_vocab(self):
+        with self.lock: vocab, fresh = self.vocab, list(self.pending)
+        if not fresh: return
+        # Sorted outside the lock. Lookups skip tokens whose last document went meanwhile; dropping them
+        # is left to the next merge for new tokens, which may have come back since
+        merged = sorted({t for t in vocab if t in self.postings}.union(fresh))
+        with self.lock:
+            self.vocab = merged
+            self.pending.difference_update(fresh)
+
+    def _read(self, path, touch):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for batch in iter(lambda: list(itertools.islice(f, LOAD_BATCH)), []):
+                rows = [row for row in (line.rstrip('\n').split('\t') for line in batch) if len(row) == 4]
+                with self.lock:
+                    for vid, title, uploader, seen in rows: self._add(vid, title, uploader, int(seen), touch)
+                if path == self.log_path: self.log_rows += len(batch)
+
+    def _load(self):
+        try:
+            # Snapshot rows are stored oldest first; log rows are later sightings, replayed in order
+            for path, touch in ((self.path, False), (self.log_path, True)):
+                try: self._read(path, touch)
+                except FileNotFoundError: pass
+        except (OSError, EOFError, ValueError) as e:
+            log.warning('Gagal memuat suggest index: %s', e)
+            # Rows appended after a damaged one would never load, so the next save compacts instead
+            self.damaged = True
+        finally:
+            self.loaded = True
+
+    def save(self):
+        """Appends the rows ingested since the last save to the log, or compacts everything into a new snapshot."""
+        # Saving before the load finished would overwrite the files with a partial index
+        if not self.path or not self.loaded: return
+        with self.save_lock:
+            with self.lock:
+                rows, self.journal = self.journal, []
+                compact = self.damaged or self.log_rows + len(rows) > max(len(self.docs), self.compact_min)
+                # Document values are immutable tuples, so copying the references is a consistent snapshot
+                if compact: ids, docs = list(self.docs), list(self.docs.values())
+            if compact:
+                tmp = f'{self.path}.{os.getpid()}.tmp'
+                with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=5) as f:
+                    f.writelines(map(_row, ids, *zip(*docs)))
+                os.replace(tmp, self.path)
+                # Dying right here only replays the old log once more, which inflates some seen counts
+                open(self.log_path, 'wb').close()
+                self.log_rows, self.damaged = 0, False
+            elif rows:
+                with gzip.open(self.log_path, 'at', encoding='utf-8', compresslevel=5) as f: f.writelines(rows)
+                self.log_rows += len(rows)
+
+    def _index(self, vid, text, add):
+        for tok in set(tokenize(text)):
+            ids = self.postings.get(tok)
+            if add:
+                if ids is None:
+                    self.postings[tok] = vid
+                    self.pending.add(tok)
+                elif isinstance(ids, str): self.postings[tok] = {ids, vid}
+                else: ids.add(vid)
+            elif ids == vid: del self.postings[tok]
+            elif isinstance(ids, set):
+                ids.discard(vid)
+                if len(ids) == 1: self.postings[tok] = ids.pop()
+
+    def _add(self, vid, title, uploader, seen=1, touch=True):
+        doc = self.docs.get(vid)
+        if doc:
+            self.docs[vid] = (doc[0], doc[1], doc[2] + seen)
+            if touch: self.docs.move_to_end(vid)
+            return
+        # Loaded rows arrive oldest first, so appending keeps LRU order either way
+        self.docs[vid] = (title, uploader, seen)
+        self._index(vid, f'{title} {uploader}', True)
+        while len(self.docs) > self.max_entries:
+            old, (t, u, _) = self.docs.popitem(last=False)
+            self._index(old, f'{t} {u}', False)
+
+    def ingest(self, results):
+        """Adds shaped search results ({'id', 'title', 'author'}) to the index."""
+        self._ensure_loaded()
+        with self.lock:
+            for r in results:
+                if r and r.get('id') and r.get('title'):
+                    title, uploader = _clean(r['title']), _clean(r.get('author'))
+                    self._add(r['id'], title, uploader)
+                    if self.path: self.journal.append(_row(r['id'], title, uploader, 1))
+
+    def _ids(self, tok):
+        ids = self.postings.get(tok)
+        return (ids,) if isinstance(ids, str) else ids or ()
+
+    def _expand(self, prefix, cap=64):
+        # Caller holds the lock
+        out = []
+        i = bisect.bisect_left(self.vocab, prefix)
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix) and len(out) < cap:
+            if self.vocab[i] in self.postings: out.append(self.vocab[i])
+            i += 1
+        out += [t for t in self.pending if t.startswith(prefix) and t in self.postings]
+        return out
+
+    def _candidates(self, words):
+        # Caller holds the lock; yields the ids matching every word (possibly repeated), walking the
+        # shortest postings and probing the others, so taking the first few thousand stops early
+        *whole, last = words
+        prefixed = [self._ids(tok) for tok in self._expand(last)]
+        postings = sorted((self._ids(w) for w in set(whole)), key=len)
+        if not postings: return itertools.chain.from_iterable(prefixed)
+        size = sum(map(len, prefixed))
+        if size <= len(postings[0]):
+            return (vid for vid in itertools.chain.from_iterable(prefixed) if all(vid in ids for ids in postings))
+        # Probing many prefix postings one by one costs more than merging them first
+        if len(postings[0]) * len(prefixed) > size: prefixed = [set().union(*prefixed)]
+        return (vid for vid in postings[0] if all(vid in ids for ids in postings[1:]) and any(vid in ids for ids in prefixed))
+
+    def query(self, q, limit=5):
+        self._ensure_loaded()
+        words = tokenize(q)
+        if not words or not self.loaded: return []
+        needle = q.strip().casefold()
+        with self.lock:
+            hit = self.recent.get((needle, limit))
+            if hit and time.monotonic() - hit[0] < self.rebuild_interval: return list(hit[1])
+            # Titles starting with the query first, then the most often seen, then the shortest. Case
+            # folding never shortens text, so folding just the title's first len(needle) characters will do
+            n = len(needle)
+            candidates = set(itertools.islice(self._candidates(words), RANK_LIMIT))
+            best = heapq.nsmallest(limit, map(self.docs.__getitem__, candidates),
+                                   key=lambda doc: (not doc[0][:n].casefold().startswith(needle), -doc[2], len(doc[0])))
+            titles = [doc[0] for doc in best]
+            self.recent[(needle, limit)] = (time.monotonic(), tuple(titles))
+            self.recent.move_to_end((needle, limit))
+            while len(self.recent) > 1024: self.recent.popitem(last=False)
+            return titles
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.docs), 'max_entries': self.max_entries, 'tokens': len(self.postings),
+                    'loaded': self.loaded, 'log_rows': self.log_rows + len(self.journal)}
@@ -0,0 +1,107 @@
+import io, logging, os, threading, time, urllib.error, urllib.request
+from singleflight import SingleFlight
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # without Pillow the 320x180 upstream image is cached once and served for every size
+    Image = None
+
+log = logging.getLogger(__name__)
+
+# (width, height) of the boxes the templates draw thumbnails into (object-fit: cover)
+SIZES = { 'card': (320, 180), 'list': (200, 120), 'small': (160, 90), 'compact': (120, 80) }
+# mqdefault is 16:9 without letterboxing and already covers the largest size
+SOURCE_URL = 'https://i.ytimg.com/vi/{id}/mqdefault.jpg'
+
+
+def thumb_url(entry, size=None):
+    # Points search results at /api/thumb (which defaults to the UI's size); entries without an id
+    # keep yt-dlp's (largest) thumbnail
+    if entry.get('id'): return f"/api/thumb/{entry['id']}" + (f'?size={size}' if size else '')
+    return (entry.get('thumbnails') or [{}])[-1].get('url')
+
+
+class ThumbNotFound(Exception):
+    pass
+
+
+class ThumbCache:
+    """Bounded on-disk cache of resized video thumbnails.
+
+    Each (video id, size) is fetched and resized once; concurrent misses
+    are coalesced. Files are kept under ``folder`` and the least recently
+    served are deleted once the total passes ``max_bytes``.
+    """
+
+    def __init__(self, folder, max_bytes=200 * 1024**2, quality=80):
+        self.folder, self.max_bytes, self.quality = folder, max_bytes, quality
+        os.makedirs(folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.flights = SingleFlight()
+        self.hits = self.misses = self.evictions = 0
+        # name -> (size, last served); seeded from disk so the bound holds across restarts
+        self.files = {}
+        with os.scandir(folder) as it:
+            for e in it:
+                if e.is_file() and e.name.endswith('.jpg'):
+                    st = e.stat()
+                    self.files[e.name] = (st.st_size, st.st_mtime)
+        self.bytes = sum(size for size, _ in self.files.values())
+
+    def _fetch(self, video_id):
+        try:
+            with urllib.request.urlopen(SOURCE_URL.format(id=video_id), timeout=10) as resp: return resp.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404: raise ThumbNotFound(video_id)
+            raise
+
+    def _resize(self, data, size):
+        if Image is None: return data
+        with Image.open(io.BytesIO(data)) as img:
+            out = io.BytesIO()
+            ImageOps.fit(img.convert('RGB'), SIZES[size], Image.LANCZOS).save(out, 'JPEG', quality=self.quality,
+                                                                             optimize=True, progressive=True)
+            return out.getvalue()
+
+    def _produce(self, video_id, size, name):
+        data = self._resize(self._fetch(video_id), size)
+        path = os.path.join(self.folder, name)
+        tmp = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f: f.write(data)
+        os.replace(tmp, path)
+        with self.lock:
+            old = self.files.get(name)
+            self.bytes += len(data) - (old[0] if old else 0)
+            self.files[name] = (len(data), time.time())
+            self._evict(keep=name)
+        return path
+
+    def _evict(self, keep):
+        # Caller holds the lock
+        if self.bytes <= self.max_bytes: return
+        for name, (size, _) in sorted(self.files.items(), key=lambda kv: kv[1][1]):
+            if self.bytes <= self.max_bytes: break
+            if name == keep: continue
+            try: os.remove(os.path.join(self.folder, name))
+            except OSError: pass
+            del self.files[name]
+            self.bytes -= size
+            self.evictions += 1
+
+    def get(self, video_id, size):
+        """Returns the path of the resized thumbnail, fetching it on a miss."""
+        # Unresized, every size is the same bytes, so they share one file and one upstream fetch
+        name = f'{video_id}-{size if Image else "source"}.jpg'
+        with self.lock:
+            entry = self.files.get(name)
+            if entry and os.path.isfile(os.path.join(self.folder, name)):
+                self.files[name] = (entry[0], time.time())
+                self.hits += 1
+                return os.path.join(self.folder, name)
+            self.misses += 1
+        return self.flights.do(name, lambda: self._produce(video_id, size, name))
+
+    def stats(self):
+        with self.lock:
+            return {'files': len(self.files), 'bytes': self.bytes, 'max_bytes': self.max_bytes, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions, 'resize': Image is not None}
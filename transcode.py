@@ -0,0 +1,88 @@
+import os, shutil, subprocess, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from streaming import iter_ffmpeg, primed
+
+# ext/mime: output extension and content type, args: encoder arguments, muxer: ffmpeg -f for piped output,
+# copy: source acodec prefixes that can be remuxed as-is instead of re-encoded
+PRESETS = {
+    'mp3-128': { 'ext': 'mp3', 'mime': 'audio/mpeg', 'args': ['-c:a', 'libmp3lame', '-b:a', '128k'], 'muxer': ['-f', 'mp3'] },
+    'mp3-192': { 'ext': 'mp3', 'mime': 'audio/mpeg', 'args': ['-c:a', 'libmp3lame', '-b:a', '192k'], 'muxer': ['-f', 'mp3'] },
+    'mp3-320': { 'ext': 'mp3', 'mime': 'audio/mpeg', 'args': ['-c:a', 'libmp3lame', '-b:a', '320k'], 'muxer': ['-f', 'mp3'] },
+    'opus': { 'ext': 'opus', 'mime': 'audio/ogg', 'args': ['-c:a', 'libopus', '-b:a', '128k'], 'muxer': ['-f', 'opus'], 'copy': ('opus',) },
+    'm4a': { 'ext': 'm4a', 'mime': 'audio/mp4', 'args': ['-c:a', 'aac', '-b:a', '192k'], 'copy': ('mp4a', 'aac'),
+             'muxer': ['-f', 'ipod', '-movflags', 'frag_keyframe+empty_moov'] },
+}
+DEFAULT_PRESET = { 'mp3': 'mp3-192', 'opus': 'opus', 'm4a': 'm4a' }
+
+def preset_for(fmt, quality=None):
+    name = f'{fmt}-{quality}' if quality else DEFAULT_PRESET.get(fmt)
+    return name if name in PRESETS else DEFAULT_PRESET.get(fmt)
+
+def can_copy(preset, acodec):
+    return bool(acodec) and any(acodec.startswith(c) for c in PRESETS[preset].get('copy', ()))
+
+
+class Transcoder:
+    """Runs ffmpeg audio encodes off the request thread, at most ``workers`` at a time.
+
+    Every encode is its own ffmpeg process, so the workers only wait on
+    children and never compete for the GIL; sizing the pool to the CPU
+    count keeps one encoder per core. Sources whose codec already matches
+    the preset are remuxed with ``-c:a copy``. Piped encodes for streamed
+    responses (``piped``) count against the same ``workers`` limit.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 2
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='transcode')
+        self.slots = threading.Semaphore(self.workers)
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    def args(self, preset, acodec=None, piped=False):
+        p = PRESETS[preset]
+        codec = ['-c:a', 'copy'] if can_copy(preset, acodec) else p['args']
+        return ['-vn', *codec, *(p['muxer'] if piped else [])]
+
+    def _run(self, preset, src, dst, acodec, duration):
+        ffmpeg = shutil.which('ffmpeg')
+        if not ffmpeg: raise RuntimeError('ffmpeg tidak ditemukan')
+        tmp = f'{dst}.{threading.get_ident()}.part.{PRESETS[preset]["ext"]}'
+        start = time.perf_counter()
+        with self.slots:
+            proc = subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', src, *self.args(preset, acodec), tmp],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            try: os.remove(tmp)
+            except OSError: pass
+            raise RuntimeError(f'ffmpeg gagal: {proc.stderr.decode(errors="replace").strip()[-300:]}')
+        os.replace(tmp, dst)
+        seconds = time.perf_counter() - start
+        result = { 'preset': preset, 'path': dst, 'seconds': round(seconds, 3), 'remuxed': can_copy(preset, acodec),
+                   'rtf': round(duration / seconds, 1) if duration and seconds else None }
+        with self.lock:
+            t = self.totals.setdefault(preset, { 'jobs': 0, 'seconds': 0.0, 'media_seconds': 0.0, 'remuxed': 0 })
+            t['jobs'] += 1
+            t['seconds'] += seconds
+            t['media_seconds'] += duration or 0
+            t['remuxed'] += result['remuxed']
+        return result
+
+    def transcode(self, preset, src, dst_base, acodec=None, duration=None):
+        dst = f'{dst_base}.{PRESETS[preset]["ext"]}'
+        return self.executor.submit(self._run, preset, src, dst, acodec, duration).result()
+
+    def piped(self, preset, source, acodec=None):
+        """``source`` chunks encoded by an ffmpeg pipe that holds one of the worker slots until it is closed,
+        or None while every slot is busy. Started already, so ffmpeg failing to start raises here."""
+        if not self.slots.acquire(blocking=False): return None
+        def run():
+            try: yield from iter_ffmpeg(source, self.args(preset, acodec, piped=True))
+            finally: self.slots.release()
+        return primed(run())
+
+    def stats(self):
+        with self.lock:
+            return { 'workers': self.workers, 'presets': {
+                name: { **t, 'rtf': round(t['media_seconds'] / t['seconds'], 1) if t['seconds'] else None }
+                for name, t in self.totals.items() } }
@@ -0,0 +1,142 @@
+import heapq, itertools, logging, random, re, threading, time
+
+log = logging.getLogger(__name__)
+
+# Lower runs first: people typing beat page loads, page loads beat downloads and background refreshes
+INTERACTIVE, NORMAL, BULK = 0, 1, 2
+
+# yt-dlp reports upstream trouble as DownloadError/ExtractorError text, so errors are classified by message
+THROTTLE_RE = re.compile(r'HTTP Error 429|Too Many Requests|Sign in to confirm|rate.?limit', re.I)
+# Other 4xx answers (removed or private videos, bad ids) come out the same on every try
+PERMANENT_RE = re.compile(r'HTTP Error 4(?!29)\d\d', re.I)
+TRANSIENT_RE = re.compile(r'HTTP Error 5\d\d|timed? ?out|Connection (reset|refused|aborted)|Temporary failure'
+                          r'|Remote end closed|IncompleteRead', re.I)
+
+def classify(e):
+    msg = str(e)
+    if THROTTLE_RE.search(msg): return 'throttled'
+    if PERMANENT_RE.search(msg): return 'permanent'
+    if TRANSIENT_RE.search(msg) or isinstance(e, (TimeoutError, ConnectionError)): return 'transient'
+    return None
+
+
+class UpstreamBusy(Exception):
+    """Raised when a call could not start within ``max_wait``; maps to 503 + Retry-After."""
+
+
+class UpstreamThrottled(Exception):
+    """Raised when the upstream kept throttling after all retries; maps to 503 + Retry-After."""
+
+
+class UpstreamLimiter:
+    """Shared gate for every upstream (YouTube) extraction.
+
+    A call starts only when a token is available (``rate`` per second,
+    bursts up to ``burst``) and fewer than ``limit`` calls are running.
+    The limit adapts AIMD-style: each fast success adds 1/limit, a slow
+    or transient failure multiplies it by 0.9 and a throttling response
+    halves it and empties the bucket (at most one decrease per
+    ``cooldown`` seconds). Waiters are served by priority, then FIFO.
+    Transient and throttling errors are retried with full-jitter
+    exponential backoff.
+    """
+
+    def __init__(self, rate=5.0, burst=10, min_limit=1, max_limit=32, initial_limit=8,
+                 target_latency=5.0, max_wait=30.0, retries=2, backoff=0.5, cooldown=2.0):
+        self.rate, self.burst = rate, burst
+        self.min_limit, self.max_limit = min_limit, max_limit
+        self.target_latency, self.max_wait = target_latency, max_wait
+        self.retries, self.backoff, self.cooldown = retries, backoff, cooldown
+        self.cond = threading.Condition()
+        self.waiters = []              # heap of (priority, seq)
+        self.seq = itertools.count()
+        self.tokens, self.updated = float(burst), time.monotonic()
+        self.limit = float(initial_limit)
+        self.inflight = 0
+        self.last_decrease = 0.0
+        self.counts = {'calls': 0, 'ok': 0, 'retries': 0, 'throttled': 0, 'transient': 0, 'permanent': 0, 'rejected': 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority=NORMAL):
+        deadline = time.monotonic() + self.max_wait
+        with self.cond:
+            me = (priority, next(self.seq))
+            heapq.heappush(self.waiters, me)
+            try:
+                while True:
+                    self._refill()
+                    if self.waiters[0] == me and self.tokens >= 1 and self.inflight < int(self.limit):
+                        heapq.heappop(self.waiters)
+                        self.tokens -= 1
+                        self.inflight += 1
+                        self.cond.notify_all()
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counts['rejected'] += 1
+                        raise UpstreamBusy('Server sedang sibuk, coba lagi nanti')
+                    # Without a token nobody can start before the next refill, so sleep until then
+                    self.cond.wait(min(remaining, (1 - self.tokens) / self.rate) if self.tokens < 1 else remaining)
+            except BaseException:
+                if me in self.waiters:
+                    self.waiters.remove(me)
+                    heapq.heapify(self.waiters)
+                    self.cond.notify_all()
+                raise
+
+    def release(self, latency, outcome=None):
+        with self.cond:
+            self.inflight -= 1
+            now = time.monotonic()
+            # A permanent error is still a prompt answer, so only slow or failing upstreams cut the limit
+            if outcome in (None, 'permanent') and latency <= self.target_latency:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif now - self.last_decrease >= self.cooldown:
+                self.last_decrease = now
+                self.limit = max(self.min_limit, self.limit * (0.5 if outcome == 'throttled' else 0.9))
+                if outcome == 'throttled': self.tokens = min(self.tokens, 0.0)
+            self.cond.notify_all()
+
+    def call(self, fn, priority=NORMAL):
+        for attempt in range(self.retries + 1):
+            self.acquire(priority)
+            start = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                outcome = classify(e)
+                self.release(time.monotonic() - start, outcome)
+                with self.cond:
+                    self.counts['calls'] += 1
+                    if outcome: self.counts[outcome] += 1
+                if outcome in (None, 'permanent'): raise
+                if attempt == self.retries:
+                    if outcome == 'throttled': raise UpstreamThrottled(str(e)) from e
+                    raise
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                log.info('Upstream %s (%s), coba lagi dalam %.2fs', outcome, e, delay)
+                with self.cond: self.counts['retries'] += 1
+                time.sleep(delay)
+                continue
+            self.release(time.monotonic() - start)
+            with self.cond:
+                self.counts['calls'] += 1
+                self.counts['ok'] += 1
+            return result
+
+    def retry_after(self):
+        # Rough time for the current queue (and any token deficit) to drain at the token rate
+        with self.cond:
+            self._refill()
+            return max(1, int((len(self.waiters) + 1 - min(self.tokens, 0)) / self.rate))
+
+    def stats(self):
+        with self.cond:
+            self._refill()
+            return {**self.counts, 'limit': round(self.limit, 2), 'inflight': self.inflight,
+                    'waiting': len(self.waiters), 'tokens': round(self.tokens, 2), 'rate': self.rate,
+                    'burst': self.burst}
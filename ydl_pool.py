@@ -0,0 +1,126 @@
+import atexit, threading
+from upstream import NORMAL
+from collections import defaultdict
+from contextlib import contextmanager
+
+def flat_search_opts(n):
+    return { 'quiet': True, 'extract_flat': 'in_playlist', 'default_search': f'ytsearch{n}:' }
+
+
+class _Hooks:
+    # Pooled instances get one permanent hook that forwards to whatever the current borrower set
+    def __init__(self): self.progress, self.postprocessor = [], []
+    def on_progress(self, d):
+        for hook in self.progress: hook(d)
+    def on_postprocessor(self, d):
+        for hook in self.postprocessor: hook(d)
+
+
+class _Limited:
+    # What checkout() hands out when the pool has a limiter: extract_info goes through it.
+    # download=True is split into a limited extraction and an unlimited process_ie_result, so
+    # slow media transfers do not hold an upstream slot or skew the latency the limiter adapts to.
+    def __init__(self, ydl, limiter, priority):
+        self._ydl, self._limiter, self._priority = ydl, limiter, priority
+
+    def __getattr__(self, name): return getattr(self._ydl, name)
+
+    def extract_info(self, url, download=True, *args, **kwargs):
+        info = self._limiter.call(lambda: self._ydl.extract_info(url, False, *args, **kwargs), self._priority)
+        if not download or not kwargs.get('process', True): return info
+        return self._ydl.process_ie_result(info, download=True)
+
+
+class YdlPool:
+    """Pool of pre-built YoutubeDL instances keyed by option profile.
+
+    A YoutubeDL object is not safe to share between threads, so each
+    ``checkout`` hands one instance to a single caller and takes it back
+    afterwards; building one per request would rebuild the extractor
+    registry, cookie jar and HTTP handlers every time. Up to ``max_idle``
+    instances per profile are kept. An instance whose block raised is
+    closed instead of returned. With ``limiter`` set, extractions run
+    through it at the priority ``priority()`` returns for the caller.
+    ``format_selector`` (a yt-dlp ``format`` callable) replaces the
+    profile's format for one checkout only. ``lease`` hands an instance
+    out past a single block (a lazy result still fetching through it)
+    until its release callable is called.
+    """
+
+    def __init__(self, profiles=None, max_idle=8, factory=None, limiter=None, priority=None):
+        self.profiles = dict(profiles or {})
+        self.max_idle = max_idle
+        self.factory = factory
+        self.limiter, self.priority = limiter, priority
+        self.lock = threading.Lock()
+        self.idle = defaultdict(list)
+        self.created = self.reused = 0
+        atexit.register(self.close)
+
+    def register(self, name, opts): self.profiles[name] = opts
+
+    def _create(self, name):
+        if self.factory is None:
+            from yt_dlp import YoutubeDL
+            self.factory = YoutubeDL
+        hooks = _Hooks()
+        opts = {**self.profiles[name], 'progress_hooks': [hooks.on_progress],
+                'postprocessor_hooks': [hooks.on_postprocessor]}
+        with self.lock: self.created += 1
+        return self.factory(opts), hooks
+
+    def _take(self, name):
+        with self.lock:
+            item = self.idle[name].pop() if self.idle[name] else None
+            if item: self.reused += 1
+        return item or self._create(name)
+
+    def _give_back(self, name, ydl, hooks):
+        hooks.progress, hooks.postprocessor = [], []
+        with self.lock:
+            if len(self.idle[name]) < self.max_idle:
+                self.idle[name].append((ydl, hooks))
+                return
+        ydl.close()
+
+    def lease(self, name):
+        # For a caller that keeps the instance, e.g. behind a lazy result that still fetches through it.
+        # Returns (ydl, release); the instance is outside the limiter, so the caller goes through it itself.
+        # release(failed=True) closes the instance instead of returning it.
+        ydl, hooks = self._take(name)
+        def release(failed=False):
+            if failed: ydl.close()
+            else: self._give_back(name, ydl, hooks)
+        return ydl, release
+
+    def warm(self, *names):
+        for name in names or self.profiles:
+            item = self._create(name)
+            with self.lock: self.idle[name].append(item)
+
+    @contextmanager
+    def checkout(self, name, progress_hooks=(), postprocessor_hooks=(), format_selector=None):
+        ydl, hooks = self._take(name)
+        hooks.progress, hooks.postprocessor = list(progress_hooks), list(postprocessor_hooks)
+        # YoutubeDL builds its selector from params['format'] once, in __init__; swap the built one
+        default_selector = ydl.format_selector
+        if format_selector: ydl.format_selector = format_selector
+        try:
+            if self.limiter is None: yield ydl
+            else: yield _Limited(ydl, self.limiter, self.priority() if self.priority else NORMAL)
+        except BaseException:
+            ydl.close()
+            raise
+        ydl.format_selector = default_selector
+        self._give_back(name, ydl, hooks)
+
+    def close(self):
+        with self.lock:
+            items = [item for items in self.idle.values() for item in items]
+            self.idle.clear()
+        for ydl, _ in items: ydl.close()
+
+    def stats(self):
+        with self.lock:
+            return {'created': self.created, 'reused': self.reused,
+                    'idle': {name: len(items) for name, items in self.idle.items()}}